@@ -102,8 +102,8 @@ async function convertPDFAndUploadToMongoDB(pdfFile: File, date: string): Promis
       const pythonScript = `
 import sys
 import os
+import io
 import base64
-import tempfile
 import traceback
 
 # Add the python-scripts directory to the path
@@ -136,37 +136,14 @@ try:
         print(f"ERROR: Failed to decode PDF data: {e}")
         sys.exit(1)
     
-    # Create temporary file
-    temp_file = None
-    try:
-        temp_file = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
-        temp_file.write(pdf_data)
-        temp_file.close()
-        temp_path = temp_file.name
-    except Exception as e:
-        print(f"ERROR: Failed to create temporary file: {e}")
-        sys.exit(1)
-    
-    # Parse PDF to DataFrame
+    # Parse PDF to DataFrame straight from memory (no temporary file)
     try:
         parser = FixedRainfallParser(debug=False)
-        df = parser.process_pdf_to_dataframe(temp_path)
+        df = parser.process_pdf_to_dataframe(io.BytesIO(pdf_data))
     except Exception as e:
         print(f"ERROR: Failed to parse PDF: {e}")
         print(f"ERROR: Traceback: {traceback.format_exc()}")
-        if temp_file:
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
         sys.exit(1)
-    finally:
-        # Clean up temporary file
-        if temp_file:
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
     
     if df.empty:
         print("ERROR: No data extracted from PDF")
@@ -174,6 +151,7 @@ try:
     
     # Add date column with standardized format
     df['date'] = '${date}'
+    df['taluka_lc'] = df['taluka'].str.lower()
     
     # Convert DataFrame to list of dictionaries for MongoDB
     records = df.to_dict('records')
@@ -17,7 +17,9 @@ export async function GET(request: NextRequest) {
     }
     
     if (taluka) {
-      query.taluka = { $regex: new RegExp(taluka, 'i') }; // Case-insensitive search
+      // Anchored prefix on the lowercase copy so the taluka_lc index is used
+      const escaped = taluka.toLowerCase().replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+      query.taluka_lc = { $regex: `^${escaped}` };
     }
     
     const data = await RainfallData.find(query).sort({ taluka: 1, date: 1 });
@@ -41,6 +43,7 @@ export async function POST(request: NextRequest) {
     
     const rainfallData = new RainfallData({
       taluka,
+      taluka_lc: String(taluka).toLowerCase(),
       rain_till_yesterday: Number(rain_till_yesterday) || 0,
       rain_last_24hrs: Number(rain_last_24hrs) || 0,
       total_rainfall: Number(total_rainfall) || 0,
@@ -1,7 +1,10 @@
 import mongoose from 'mongoose';
 
 export interface IRainfallData {
+  region?: string;
+  district?: string;
   taluka: string;
+  taluka_lc?: string; // lowercase taluka, used for indexed case-insensitive lookups
   rain_till_yesterday: number;
   rain_last_24hrs: number;
   total_rainfall: number;
@@ -12,11 +15,20 @@ export interface IRainfallData {
 }
 
 const rainfallDataSchema = new mongoose.Schema<IRainfallData>({
+  region: {
+    type: String,
+  },
+  district: {
+    type: String,
+  },
   taluka: {
     type: String,
     required: true,
     index: true,
   },
+  taluka_lc: {
+    type: String,
+  },
   rain_till_yesterday: {
     type: Number,
     default: 0,
@@ -44,8 +56,11 @@ const rainfallDataSchema = new mongoose.Schema<IRainfallData>({
 
 // Create compound index for efficient queries
 rainfallDataSchema.index({ date: 1, taluka: 1 });
+rainfallDataSchema.index({ taluka_lc: 1, date: 1 });
 
-// Prevent duplicate entries for same taluka and date
-rainfallDataSchema.index({ date: 1, taluka: 1 }, { unique: true });
+// Prevent duplicate entries for same taluka and date. District is part of the key:
+// District/Region Avg rows and same-named talukas in different districts share a date.
+// Kept in sync with python-scripts/schema_manager.py.
+rainfallDataSchema.index({ date: 1, district: 1, taluka: 1 }, { unique: true });
 
 export default mongoose.models.RainfallData || mongoose.model<IRainfallData>('RainfallData', rainfallDataSchema); 
\ No newline at end of file
@@ -1,6 +1,9 @@
 import os
 import sys
+import functools
 from parser import FixedRainfallParser
+from bulletin_validation import validate_parsed_pdf
+from change_detection import ChunkedDateSync, add_content_hashes, sync_date_documents
 import pandas as pd
 from pymongo import MongoClient
 import re
@@ -8,42 +11,48 @@ import re
 # --- CONFIG ---
 PDF_DIR = os.path.join(os.path.dirname(__file__), "..", "public", "csvs")
 MONGO_URI = os.environ.get('MONGODB_URI')
-if not MONGO_URI:
-    raise RuntimeError('Please set the MONGODB_URI environment variable.')
 DB_NAME = "rainfall-data"
 COLLECTION_NAME = "rainfalldatas"
 
+def get_database():
+    if not MONGO_URI:
+        raise RuntimeError('Please set the MONGODB_URI environment variable.')
+    client = MongoClient(MONGO_URI)
+    return client[DB_NAME]
+
 # --- STEP 1: Convert all PDFs to CSVs ---
-parser = FixedRainfallParser(debug=False)
-for fname in os.listdir(PDF_DIR):
-    if fname.lower().endswith(".pdf"):
-        pdf_path = os.path.join(PDF_DIR, fname)
-        csv_path = pdf_path.replace(".pdf", ".csv")
-        print(f"[PDF→CSV] Processing {fname} ...")
-        try:
-            df = parser.process_pdf_to_dataframe(pdf_path)
-            if not df.empty:
-                parser.save_to_csv(df, csv_path)
-                print(f"[PDF→CSV] Saved CSV: {csv_path}")
-            else:
-                print(f"[PDF→CSV] No data extracted from {fname}")
-        except Exception as e:
-            print(f"[PDF→CSV] Error processing {fname}: {e}")
+def convert_pdfs_to_csvs(pdf_dir=PDF_DIR, quarantine=False, journal=None):
+    parser = FixedRainfallParser(debug=False)
+    for fname in os.listdir(pdf_dir):
+        if fname.lower().endswith(".pdf"):
+            pdf_path = os.path.join(pdf_dir, fname)
+            csv_path = pdf_path.replace(".pdf", ".csv")
+            if journal:
+                journal.sync(pdf_path)
+                if os.path.exists(csv_path) and journal.is_done(fname, "csv"):
+                    print(f"[PDF→CSV] {fname} already converted, skipping")
+                    continue
+            print(f"[PDF→CSV] Processing {fname} ...")
+            stage = "parsed"
+            try:
+                df = parser.process_pdf_to_dataframe(pdf_path)
+                df = validate_parsed_pdf(df, pdf_path, quarantine=quarantine)
+                if journal:
+                    journal.mark(fname, "parsed")
+                stage = "csv"
+                if not df.empty:
+                    parser.save_to_csv(df, csv_path)
+                    if journal:
+                        journal.mark(fname, "csv")
+                    print(f"[PDF→CSV] Saved CSV: {csv_path}")
+                else:
+                    print(f"[PDF→CSV] No data extracted from {fname}")
+            except Exception as e:
+                if journal:
+                    journal.fail(fname, stage, str(e))
+                print(f"[PDF→CSV] Error processing {fname}: {e}")
 
 # --- STEP 2: Upload all CSVs to MongoDB ---
-def clean_numeric_value(value):
-    if pd.isna(value) or value == '' or value == 'nan':
-        return 0.0
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return 0.0
-
-def clean_string_value(value):
-    if pd.isna(value) or value == '' or str(value).lower() == 'nan':
-        return ''
-    return str(value).strip()
-
 def extract_date_from_csv(df, fallback_filename=None):
     # Try to extract date from a 'date' column if present
     if 'date' in df.columns and not df['date'].isnull().all():
@@ -71,62 +80,242 @@ def extract_date_from_csv(df, fallback_filename=None):
                 return f"{day:02d}.{month}.2025"
     return None
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-collection = db[COLLECTION_NAME]
-
-# print("[CSV→MongoDB] Clearing existing data from database...")
-# result = collection.delete_many({})
-# print(f"[CSV→MongoDB] Deleted {result.deleted_count} existing records")
-
-total_records = 0
-for fname in os.listdir(PDF_DIR):
-    if not fname.lower().endswith('.csv'):
-        continue
-    path = os.path.join(PDF_DIR, fname)
-    try:
-        df = pd.read_csv(path)
-        date_str = extract_date_from_csv(df, fallback_filename=fname)
-        if not date_str:
-            print(f"[CSV→MongoDB] Could not extract date from {fname}, skipping.")
-            continue
-        df["date"] = date_str
-        print(f"[CSV→MongoDB] Processing {fname} (date: {date_str}) ...")
+STRING_FIELDS = ['region', 'district', 'taluka']
+NUMERIC_FIELDS = ['sr_no', 'avg_rain_1995_2024', 'rain_till_yesterday', 'rain_last_24hrs',
+                  'total_rainfall', 'percent_against_avg']
+# Every column is read as text so chunked reads skip type inference and parse the same
+# way; dataframe_to_records coerces the metrics, turning stray cells like '-' into 0.0
+CSV_DTYPES = {field: str for field in STRING_FIELDS + NUMERIC_FIELDS + ['date']}
+CSV_CHUNK_SIZE = 5000
+
+def dataframe_to_records(df, date_str):
+    """Convert a parsed/loaded bulletin DataFrame into MongoDB documents for one date."""
+    columns = {}
+    for field in STRING_FIELDS:
+        values = df[field] if field in df.columns else pd.Series('', index=df.index)
+        columns[field] = values.astype(object).where(values.notna(), '').astype(str).str.strip()
+        columns[field] = columns[field].mask(columns[field].str.lower() == 'nan', '')
+    for field in NUMERIC_FIELDS:
+        values = df[field] if field in df.columns else pd.Series(0.0, index=df.index)
+        columns[field] = pd.to_numeric(values, errors='coerce').fillna(0.0).astype(float)
+
+    out = pd.DataFrame(columns, index=df.index)[
+        ['region', 'district', 'sr_no', 'taluka', 'avg_rain_1995_2024', 'rain_till_yesterday',
+         'rain_last_24hrs', 'total_rainfall', 'percent_against_avg']]
+    out['date'] = date_str
+    # Lowercase copy for indexed case-insensitive taluka lookups
+    out['taluka_lc'] = out['taluka'].str.lower()
+    # Each document carries a hash of its content so re-ingests can skip unchanged rows
+    return add_content_hashes(out[out['taluka'] != ''].to_dict('records'))
+
+def write_date_records(collection, date_str, records, batch_size=100, replace=True):
+    """Write `records` for `date_str`; with `replace`, existing documents for the date go first."""
+    if replace:
         # Remove existing records for this date to avoid duplicates
         collection.delete_many({'date': date_str})
-        records = []
-        for _, row in df.iterrows():
-            if pd.isna(row.get('taluka')) or str(row.get('taluka')).strip() == '':
+    for i in range(0, len(records), batch_size):
+        batch = records[i:i + batch_size]
+        collection.insert_many(batch)
+    return len(records)
+
+DIFF_KEY_FIELDS = ('district', 'taluka')
+
+def write_date_records_diff(collection, date_str, records, dry_run=False, replace=True, sync=None):
+    """
+    Diff-mode counterpart of `write_date_records`: only inserts/updates/deletes what changed.
+    Chunks of a streamed file go through `sync`, which defers deletes to the end of the file.
+    """
+    if sync is not None:
+        sync.write(date_str, records)
+    else:
+        sync_date_documents(collection, date_str, records, DIFF_KEY_FIELDS, dry_run=dry_run, replace=replace)
+    return len(records)
+
+def stream_csv_records(path, fallback_date=None, chunksize=CSV_CHUNK_SIZE, override_date=None):
+    """
+    Yields (date, records) per date per chunk of a CSV without loading the whole file.
+    Rows keep their own 'date' value when the file has one (merged multi-day exports);
+    otherwise `fallback_date` applies. `override_date` stamps every row regardless.
+    """
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=CSV_DTYPES):
+        has_dates = 'date' in chunk.columns and chunk['date'].notna().any()
+        if override_date or not has_dates:
+            date_str = override_date or fallback_date
+            if date_str:
+                records = dataframe_to_records(chunk, date_str)
+                if records:
+                    yield date_str, records
+            continue
+        if fallback_date:
+            chunk['date'] = chunk['date'].fillna(fallback_date)
+        for date_str, rows in chunk.groupby('date', sort=False):
+            records = dataframe_to_records(rows, str(date_str).strip())
+            if records:
+                yield str(date_str).strip(), records
+
+def peek_csv_date(path, fname):
+    """Date for a CSV from its first 'date' value or its filename, reading only the head."""
+    head = pd.read_csv(path, nrows=50, dtype=CSV_DTYPES)
+    return extract_date_from_csv(head, fallback_filename=fname)
+
+def upload_csvs(write_records, pdf_dir=PDF_DIR, journal=None, sync=None):
+    # print("[CSV→MongoDB] Clearing existing data from database...")
+    # result = collection.delete_many({})
+    # print(f"[CSV→MongoDB] Deleted {result.deleted_count} existing records")
+
+    total_records = 0
+    for fname in os.listdir(pdf_dir):
+        if not fname.lower().endswith('.csv'):
+            continue
+        path = os.path.join(pdf_dir, fname)
+        if journal and journal.is_done(fname, "uploaded"):
+            print(f"[CSV→MongoDB] {fname} already uploaded, skipping")
+            continue
+        try:
+            date_str = peek_csv_date(path, fname)
+            if not date_str:
+                print(f"[CSV→MongoDB] Could not extract date from {fname}, skipping.")
                 continue
-            record = {
-                'region': clean_string_value(row.get('region', '')),
-                'district': clean_string_value(row.get('district', '')),
-                'sr_no': clean_numeric_value(row.get('sr_no', 0)),
-                'taluka': clean_string_value(row.get('taluka', '')),
-                'avg_rain_1995_2024': clean_numeric_value(row.get('avg_rain_1995_2024', 0)),
-                'rain_till_yesterday': clean_numeric_value(row.get('rain_till_yesterday', 0)),
-                'rain_last_24hrs': clean_numeric_value(row.get('rain_last_24hrs', 0)),
-                'total_rainfall': clean_numeric_value(row.get('total_rainfall', 0)),
-                'percent_against_avg': clean_numeric_value(row.get('percent_against_avg', 0)),
-                'date': date_str
-            }
-            if record['taluka'] and record['taluka'] != '':
-                records.append(record)
-        if records:
-            batch_size = 100
-            for i in range(0, len(records), batch_size):
-                batch = records[i:i + batch_size]
-                collection.insert_many(batch)
-            total_records += len(records)
-            print(f"[CSV→MongoDB] Uploaded {len(records)} records from {fname}")
-        else:
-            print(f"[CSV→MongoDB] No valid records found in {fname}")
-    except Exception as e:
-        print(f"[CSV→MongoDB] Error processing {fname}: {e}")
-        continue
-
-print(f"[CSV→MongoDB] All files uploaded successfully! Total records: {total_records}")
-final_count = collection.count_documents({})
-print(f"[CSV→MongoDB] Total records in database: {final_count}")
-dates = collection.distinct('date')
-print(f"[CSV→MongoDB] Available dates: {sorted(dates)}") 
\ No newline at end of file
+            print(f"[CSV→MongoDB] Processing {fname} (date: {date_str}) ...")
+            # Chunks are written as they are read; each date is cleared before its first chunk.
+            # In diff mode `sync` instead removes what the file lacks once its last chunk is in
+            replaced_dates = set()
+            file_records = 0
+            sync_kwargs = {'sync': sync} if sync is not None else {}
+            for chunk_date, records in stream_csv_records(path, fallback_date=date_str):
+                file_records += write_records(chunk_date, records, replace=chunk_date not in replaced_dates,
+                                              **sync_kwargs)
+                replaced_dates.add(chunk_date)
+            if sync is not None:
+                sync.finish()
+            if file_records:
+                total_records += file_records
+                print(f"[CSV→MongoDB] Uploaded {file_records} records from {fname}")
+            else:
+                print(f"[CSV→MongoDB] No valid records found in {fname}")
+            if journal:
+                journal.mark(fname, "uploaded", date=date_str, records=file_records)
+        except Exception as e:
+            if sync is not None:
+                # A partly read file must not delete the rows its unread chunks hold
+                sync.discard()
+            if journal:
+                journal.fail(fname, "uploaded", str(e))
+            print(f"[CSV→MongoDB] Error processing {fname}: {e}")
+            continue
+    return total_records
+
+def print_collection_summary(collection, total_records):
+    print(f"[CSV→MongoDB] All files uploaded successfully! Total records: {total_records}")
+    final_count = collection.count_documents({})
+    print(f"[CSV→MongoDB] Total records in database: {final_count}")
+    dates = collection.distinct('date')
+    print(f"[CSV→MongoDB] Available dates: {sorted(dates)}")
+
+def run_batch(db, pdf_dir=PDF_DIR, pipeline=False, keep_csv=False, compact=False, diff=False,
+              dry_run=False, quarantine=False, snapshots=False, reconcile=False, fill_gaps=False,
+              resume=False):
+    """
+    PDF -> MongoDB ingest for every bulletin in `pdf_dir`.
+
+    pipeline:   overlap PDF parsing with MongoDB writes; CSVs only written with keep_csv
+    compact:    normalized storage (taluka reference docs + compact daily facts)
+    diff:       write only documents whose content hash changed; dry_run reports the diff only
+    quarantine: keep rows failing arithmetic checks out of MongoDB (always reported)
+    snapshots:  refresh per-date static files for the dates just ingested
+    reconcile:  check each new day's rain_till_yesterday against the previous day's totals;
+                fill_gaps also writes estimated records for missing days
+    resume:     skip files the run journal shows as already parsed/uploaded by an earlier,
+                interrupted run; without it the journal starts over
+    """
+    diff = diff or dry_run
+    reconcile = reconcile or fill_gaps
+    sync = None
+    if compact:
+        from taluka_reference import (DAILY_COLLECTION, FACT_KEY_FIELDS, find_rainfall, load_reservoir_links,
+                                      write_compact_date_records)
+        collection = db[DAILY_COLLECTION]
+        if diff:
+            sync = ChunkedDateSync(collection, FACT_KEY_FIELDS, dry_run=dry_run)
+        write_records = functools.partial(write_compact_date_records, db,
+                                          reservoir_links=load_reservoir_links(),
+                                          diff=diff, dry_run=dry_run)
+        fetch_rows = functools.partial(find_rainfall, db)
+    elif diff:
+        collection = db[COLLECTION_NAME]
+        write_records = functools.partial(write_date_records_diff, collection, dry_run=dry_run)
+        sync = ChunkedDateSync(collection, DIFF_KEY_FIELDS, dry_run=dry_run)
+        fetch_rows = lambda date_str: list(collection.find({'date': date_str}, {'_id': 0}))
+    else:
+        collection = db[COLLECTION_NAME]
+        write_records = functools.partial(write_date_records, collection)
+        fetch_rows = lambda date_str: list(collection.find({'date': date_str}, {'_id': 0}))
+
+    # Remember which dates were written so their static snapshots can be refreshed afterwards
+    ingested_dates = set()
+    # Cross-day reconciliation only needs the cumulative columns of each date's rows
+    reconcile_rows = {}
+    def write_and_track(date_str, records, **kwargs):
+        count = write_records(date_str, records, **kwargs)
+        ingested_dates.add(date_str)
+        if reconcile:
+            from cross_day_reconciliation import ROW_FIELDS
+            reconcile_rows.setdefault(date_str, []).extend(
+                {field: record.get(field) for field in ROW_FIELDS} for record in records)
+        return count
+
+    # A dry run writes nothing, so it neither uses nor resets the journal
+    journal = None
+    if not dry_run:
+        from run_journal import RunJournal
+        journal = RunJournal(pdf_dir, resume=resume)
+
+    if pipeline:
+        import asyncio
+        from ingest_pipeline import run_pipeline
+        total_records = asyncio.run(run_pipeline(write_and_track, pdf_dir, keep_csv=keep_csv,
+                                                 quarantine=quarantine, journal=journal))
+    else:
+        convert_pdfs_to_csvs(pdf_dir, quarantine=quarantine, journal=journal)
+        total_records = upload_csvs(write_and_track, pdf_dir, journal=journal, sync=sync)
+
+    if journal:
+        journal.print_summary()
+
+    if reconcile:
+        # Dates may arrive out of order (pipeline mode); they are reconciled chronologically
+        from cross_day_reconciliation import CrossDayReconciler, reconcile_dates
+        reconciler = CrossDayReconciler()
+        issues, filled = reconcile_dates(reconciler, reconcile_rows, fill=fill_gaps)
+        if not issues.empty:
+            print(f"[Reconcile] {len(issues)} flagged rows:")
+            print(issues[["date", "taluka_id", "issue"]].to_string(index=False))
+        if not dry_run:
+            for date_str, records in filled.items():
+                # Never replace a real bulletin that was ingested outside the reconciled sequence
+                if collection.count_documents({'date': date_str}, limit=1):
+                    continue
+                write_records(date_str, records)
+                ingested_dates.add(date_str)
+                print(f"[Reconcile] {date_str}: wrote {len(records)} estimated records")
+            reconciler.save()
+
+    print_collection_summary(collection, total_records)
+
+    if snapshots and not dry_run:
+        # Per-date static files so the site can serve common reads without a database round-trip
+        from snapshots import export_snapshots
+        export_snapshots(fetch_rows, ingested_dates)
+    return total_records
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    run_batch(get_database(), PDF_DIR,
+              pipeline='--pipeline' in argv, keep_csv='--keep-csv' in argv,
+              compact='--compact' in argv, diff='--diff' in argv, dry_run='--dry-run' in argv,
+              quarantine='--quarantine' in argv, snapshots='--snapshots' in argv,
+              reconcile='--reconcile' in argv, fill_gaps='--fill-gaps' in argv,
+              resume='--resume' in argv)
+
+if __name__ == "__main__":
+    main()
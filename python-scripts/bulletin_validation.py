@@ -0,0 +1,108 @@
+import os
+import logging
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+# Bulletin values are printed to two decimals; allow for rounding in the sums
+SUM_TOLERANCE_MM = 1.0
+PERCENT_TOLERANCE = 1.0
+# District/Region Avg rows compared against the mean of their talukas
+AVERAGE_ABS_TOLERANCE_MM = 2.0
+AVERAGE_REL_TOLERANCE = 0.05
+
+AVERAGED_FIELDS = ["avg_rain_1995_2024", "rain_till_yesterday", "rain_last_24hrs", "total_rainfall"]
+
+ISSUE_COLUMN = "validation_issue"
+
+
+def _close(actual: pd.Series, expected: pd.Series, abs_tol: float, rel_tol: float = 0.0) -> np.ndarray:
+    """Elementwise |actual - expected| <= max(abs_tol, rel_tol * |expected|); NaN counts as close."""
+    actual = actual.to_numpy(dtype=float)
+    expected = expected.to_numpy(dtype=float)
+    limit = np.maximum(abs_tol, rel_tol * np.abs(expected))
+    with np.errstate(invalid='ignore'):
+        return ~(np.abs(actual - expected) > limit)
+
+
+def validate_bulletin(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Checks a parsed bulletin for arithmetic consistency, column-wise over the whole frame:
+
+    - sum:     rain_till_yesterday + rain_last_24hrs == total_rainfall
+    - percent: percent_against_avg == total_rainfall / avg_rain_1995_2024 * 100
+    - average: each "District Avg" / "Region Avg" row matches the mean of its talukas
+
+    Returns a copy with a `validation_issue` column naming the failed checks
+    (';'-separated, empty when the row is consistent).
+    """
+    df = df.copy()
+    if df.empty:
+        df[ISSUE_COLUMN] = pd.Series(dtype=str)
+        return df
+
+    taluka = df["taluka"].astype(str)
+    is_district_avg = taluka.str.endswith(" District Avg").to_numpy()
+    is_region_avg = taluka.str.endswith(" Region Avg").to_numpy()
+    is_taluka = ~(is_district_avg | is_region_avg)
+
+    checks = pd.DataFrame(index=df.index)
+    checks["sum"] = ~_close(df["rain_till_yesterday"] + df["rain_last_24hrs"], df["total_rainfall"],
+                            SUM_TOLERANCE_MM)
+
+    avg = df["avg_rain_1995_2024"].astype(float)
+    expected_percent = (df["total_rainfall"] / avg.where(avg > 0)) * 100
+    checks["percent"] = ~_close(df["percent_against_avg"], expected_percent,
+                                PERCENT_TOLERANCE, rel_tol=0.01)
+
+    # Recompute averages from taluka rows and line them up with the printed average rows
+    talukas = df[is_taluka]
+    expected = pd.DataFrame(np.nan, index=df.index, columns=AVERAGED_FIELDS)
+    if is_district_avg.any():
+        district_means = talukas.groupby(["region", "district"])[AVERAGED_FIELDS].mean()
+        keys = pd.MultiIndex.from_frame(df.loc[is_district_avg, ["region", "district"]])
+        expected.loc[is_district_avg] = district_means.reindex(keys).to_numpy()
+    if is_region_avg.any():
+        region_means = talukas.groupby("region")[AVERAGED_FIELDS].mean()
+        expected.loc[is_region_avg] = region_means.reindex(df.loc[is_region_avg, "region"]).to_numpy()
+
+    average_ok = np.ones(len(df), dtype=bool)
+    for field in AVERAGED_FIELDS:
+        average_ok &= _close(df[field], expected[field], AVERAGE_ABS_TOLERANCE_MM, AVERAGE_REL_TOLERANCE)
+    checks["average"] = ~average_ok
+
+    # Join failed check names per row without a Python loop over rows
+    labels = checks.columns.to_numpy() + ";"
+    df[ISSUE_COLUMN] = checks.dot(labels).str.rstrip(";") if checks.any().any() else ""
+    return df
+
+
+def split_quarantine(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Validates `df` and returns (clean rows, quarantined rows), logging a summary."""
+    validated = validate_bulletin(df)
+    if validated.empty:
+        return df, validated
+
+    bad = validated[ISSUE_COLUMN] != ""
+    if bad.any():
+        counts = validated.loc[bad, ISSUE_COLUMN].str.split(";").explode().value_counts()
+        logging.warning(f"Validation flagged {int(bad.sum())} of {len(df)} rows: {counts.to_dict()}")
+    return df[~bad.to_numpy()], validated[bad]
+
+
+def validate_parsed_pdf(df: pd.DataFrame, pdf_path: str, quarantine: bool = False) -> pd.DataFrame:
+    """
+    Ingest hook: always reports inconsistent rows; with `quarantine`, drops them and
+    writes them to quarantine/<name>.csv next to the PDF for review.
+    """
+    clean, flagged = split_quarantine(df)
+    if not quarantine or flagged.empty:
+        return df
+
+    quarantine_dir = os.path.join(os.path.dirname(pdf_path), "quarantine")
+    os.makedirs(quarantine_dir, exist_ok=True)
+    out_path = os.path.join(quarantine_dir, os.path.splitext(os.path.basename(pdf_path))[0] + ".csv")
+    flagged.to_csv(out_path, index=False, encoding='utf-8')
+    logging.warning(f"Quarantined {len(flagged)} rows to '{out_path}'")
+    return clean
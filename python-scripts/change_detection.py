@@ -0,0 +1,150 @@
+import json
+import hashlib
+from typing import Dict, List, Sequence, Tuple
+
+from pymongo import DeleteMany, InsertOne, ReplaceOne
+
+HASH_FIELD = "content_hash"
+# Bookkeeping fields that never feed the hash
+_UNHASHED_FIELDS = {"_id", "date", HASH_FIELD}
+
+
+def content_hash(document: Dict) -> str:
+    """Stable digest of a document's content fields (key order and bookkeeping fields ignored)."""
+    content = {k: v for k, v in document.items() if k not in _UNHASHED_FIELDS}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def add_content_hashes(documents: List[Dict]) -> List[Dict]:
+    for document in documents:
+        document[HASH_FIELD] = content_hash(document)
+    return documents
+
+
+def _stored_hashes(collection, date_str: str, key_fields: Sequence[str]) -> Tuple[Dict[Tuple, Tuple], list]:
+    """One projection query for a date's stored (key -> (_id, hash)) map and duplicate-key _ids."""
+    projection = {field: 1 for field in key_fields}
+    projection[HASH_FIELD] = 1
+    stored: Dict[Tuple, Tuple] = {}
+    duplicate_ids = []
+    for doc in collection.find({"date": date_str}, projection):
+        key = tuple(doc.get(field) for field in key_fields)
+        if key in stored:
+            duplicate_ids.append(doc["_id"])
+        else:
+            stored[key] = (doc["_id"], doc.get(HASH_FIELD))
+    return stored, duplicate_ids
+
+
+def _diff_against(stored: Dict[Tuple, Tuple], documents: List[Dict], key_fields: Sequence[str]) -> Dict[str, list]:
+    """Classifies documents against `stored`, popping every key they cover."""
+    inserts, updates, unchanged = [], [], 0
+    for document in documents:
+        document.setdefault(HASH_FIELD, content_hash(document))
+        key = tuple(document.get(field) for field in key_fields)
+        existing = stored.pop(key, None)
+        if existing is None:
+            inserts.append(document)
+        elif existing[1] != document[HASH_FIELD]:
+            updates.append((existing[0], document))
+        else:
+            unchanged += 1
+    return {"inserts": inserts, "updates": updates, "deletes": [], "unchanged": unchanged}
+
+
+def diff_date_documents(collection, date_str: str, documents: List[Dict],
+                        key_fields: Sequence[str]) -> Dict[str, list]:
+    """
+    Compares new documents for one date against what is stored, using a single
+    projection query for (key, hash) pairs. Returns the documents to insert, the
+    (_id, document) pairs to replace and the _ids to delete; unchanged keys are counted.
+    """
+    stored, duplicate_ids = _stored_hashes(collection, date_str, key_fields)
+    diff = _diff_against(stored, documents, key_fields)
+    diff["deletes"] = [doc_id for doc_id, _ in stored.values()] + duplicate_ids
+    return diff
+
+
+def apply_diff(collection, diff: Dict[str, list]) -> int:
+    """Applies a diff in one unordered bulk write; returns the number of documents touched."""
+    operations = [InsertOne(doc) for doc in diff["inserts"]]
+    operations += [ReplaceOne({"_id": doc_id}, doc) for doc_id, doc in diff["updates"]]
+    if diff["deletes"]:
+        operations.append(DeleteMany({"_id": {"$in": diff["deletes"]}}))
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+    return len(diff["inserts"]) + len(diff["updates"]) + len(diff["deletes"])
+
+
+def _format_counts(date_str: str, counts: Dict[str, int]) -> str:
+    return (f"{date_str}: +{counts['inserts']} inserted, ~{counts['updates']} updated, "
+            f"-{counts['deletes']} deleted, {counts['unchanged']} unchanged")
+
+
+def format_diff(date_str: str, diff: Dict[str, list]) -> str:
+    return _format_counts(date_str, {"inserts": len(diff["inserts"]), "updates": len(diff["updates"]),
+                                     "deletes": len(diff["deletes"]), "unchanged": diff["unchanged"]})
+
+
+def sync_date_documents(collection, date_str: str, documents: List[Dict], key_fields: Sequence[str],
+                        dry_run: bool = False, replace: bool = True) -> Dict[str, list]:
+    """
+    Diff-mode write for one date: only changed documents are written. Without `replace`
+    (later chunks of a streamed file) stored documents missing from `documents` are kept.
+    """
+    diff = diff_date_documents(collection, date_str, documents, key_fields)
+    if not replace:
+        diff["deletes"] = []
+    prefix = "[Diff dry-run]" if dry_run else "[Diff]"
+    print(f"{prefix} {format_diff(date_str, diff)}")
+    if not dry_run:
+        apply_diff(collection, diff)
+    return diff
+
+
+class ChunkedDateSync:
+    """
+    Diff-mode writes for a file whose dates arrive in several chunks. A date's stored
+    (key, hash) map is read once, at its first chunk; every chunk is inserted or updated
+    against it, and only `finish()` (after the file's last chunk) deletes the stored
+    documents no chunk contained. Rows of a date split across chunks are never deleted
+    and re-inserted, and a dry run reports only real changes.
+    """
+
+    def __init__(self, collection, key_fields: Sequence[str], dry_run: bool = False):
+        self.collection = collection
+        self.key_fields = tuple(key_fields)
+        self.dry_run = dry_run
+        self._stored: Dict[str, Tuple[Dict[Tuple, Tuple], list]] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def write(self, date_str: str, documents: List[Dict]) -> Dict[str, list]:
+        if date_str not in self._stored:
+            self._stored[date_str] = _stored_hashes(self.collection, date_str, self.key_fields)
+            self._counts[date_str] = {"inserts": 0, "updates": 0, "deletes": 0, "unchanged": 0}
+        diff = _diff_against(self._stored[date_str][0], documents, self.key_fields)
+        counts = self._counts[date_str]
+        counts["inserts"] += len(diff["inserts"])
+        counts["updates"] += len(diff["updates"])
+        counts["unchanged"] += diff["unchanged"]
+        if not self.dry_run:
+            apply_diff(self.collection, diff)
+        return diff
+
+    def finish(self) -> Dict[str, Dict[str, int]]:
+        """Deletes what the file no longer has, prints one diff line per date and resets."""
+        prefix = "[Diff dry-run]" if self.dry_run else "[Diff]"
+        counts_by_date = self._counts
+        for date_str, (stored, duplicate_ids) in self._stored.items():
+            deletes = [doc_id for doc_id, _ in stored.values()] + duplicate_ids
+            counts_by_date[date_str]["deletes"] = len(deletes)
+            if deletes and not self.dry_run:
+                apply_diff(self.collection, {"inserts": [], "updates": [], "deletes": deletes})
+            print(f"{prefix} {_format_counts(date_str, counts_by_date[date_str])}")
+        self._stored, self._counts = {}, {}
+        return counts_by_date
+
+    def discard(self):
+        """Forgets pending deletes, e.g. when a file failed part way through."""
+        self._stored, self._counts = {}, {}
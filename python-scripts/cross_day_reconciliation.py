@@ -0,0 +1,168 @@
+"""
+Cross-day reconciliation of cumulative rainfall.
+
+A bulletin's `rain_till_yesterday` for a taluka should equal the previous bulletin's
+`total_rainfall`. Each taluka's latest total and the date it was last seen are kept in a
+small JSON state file keyed by taluka id, so each new day is checked with one join against
+that state instead of re-reading the season from MongoDB. A taluka missing from one
+bulletin is carried forward and checked again when it reappears. Missing days between the state and a new bulletin
+can be filled with interpolated cumulative values (marked `estimated`).
+"""
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bulletin_validation import SUM_TOLERANCE_MM
+from change_detection import HASH_FIELD, content_hash
+from taluka_reference import ESTIMATED_FIELD, make_taluka_id
+
+STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "reconciliation_state.json")
+DATE_FORMAT = "%d.%m.%Y"
+
+# Static fields are carried into filled records so they match parsed ones field for field
+ROW_FIELDS = ["region", "district", "sr_no", "taluka", "avg_rain_1995_2024", "rain_till_yesterday", "total_rainfall"]
+
+
+class CrossDayReconciler:
+
+    def __init__(self, state_path: str = STATE_PATH):
+        self.state_path = state_path
+        self.date: Optional[str] = None
+        self.totals = pd.Series(dtype=float)
+        self.last_seen = pd.Series(dtype=object)
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.date = state["date"]
+            self.totals = pd.Series(state["totals"], dtype=float)
+            # States written before last-seen dates were kept hold only the state date's talukas
+            self.last_seen = pd.Series(state.get("last_seen") or {tid: self.date for tid in self.totals.index},
+                                       dtype=object)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            totals = self.totals.dropna()
+            json.dump({"date": self.date, "totals": totals.to_dict(),
+                       "last_seen": self.last_seen.reindex(totals.index).to_dict()}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def reconcile(self, date_str: str, rows: List[Dict], fill: bool = False) -> Tuple[pd.DataFrame, Dict[str, List[Dict]]]:
+        """
+        Checks one day's rows against the state and advances the state to that day.
+
+        Returns (issues, filled): one row per flagged taluka with its `issue`
+        (discontinuity / new_taluka / missing_taluka), and with `fill` the estimated
+        records for each missing date between the state and `date_str`.
+        A taluka absent from a bulletin keeps its last total and is compared against it
+        when it reappears, allowing for the rain of every day it was missing.
+        Days on or before the state date are skipped (already reconciled).
+        """
+        day = datetime.strptime(date_str, DATE_FORMAT)
+        previous_day = datetime.strptime(self.date, DATE_FORMAT) if self.date else None
+        if previous_day is not None and day <= previous_day:
+            logging.info(f"[Reconcile] {date_str} is not after the reconciled state ({self.date}); skipped")
+            return pd.DataFrame(columns=["taluka_id", "issue"]), {}
+
+        today = pd.DataFrame(rows, columns=ROW_FIELDS)
+        today["taluka_id"] = [make_taluka_id(d, t) for d, t in zip(today["district"], today["taluka"])]
+        today = today.drop_duplicates("taluka_id").set_index("taluka_id")
+        for field in ("sr_no", "avg_rain_1995_2024", "rain_till_yesterday", "total_rainfall"):
+            today[field] = pd.to_numeric(today[field], errors="coerce")
+
+        filled = {}
+        if previous_day is None:
+            issues = pd.DataFrame(columns=["taluka_id", "issue"])
+        else:
+            gap_days = (day - previous_day).days - 1
+            joined = today.join(self.totals.rename("previous_total"), how="left")
+            last_seen = pd.to_datetime(self.last_seen.reindex(joined.index), format=DATE_FORMAT)
+            delta = joined["rain_till_yesterday"] - joined["previous_total"]
+            # Rain fell on days the taluka (or the whole bulletin) was missing too, so
+            # after a gap only a decrease is inconsistent
+            contiguous = (day - last_seen).dt.days == 1
+            broken = np.where(contiguous, delta.abs() > SUM_TOLERANCE_MM, delta < -SUM_TOLERANCE_MM)
+
+            joined["issue"] = np.select([joined["previous_total"].isna(), broken],
+                                        ["new_taluka", "discontinuity"], default="")
+            missing = self.totals.index.difference(today.index)
+            issues = pd.concat([
+                joined[joined["issue"] != ""].reset_index(),
+                pd.DataFrame({"taluka_id": missing, "issue": "missing_taluka",
+                              "previous_total": self.totals.reindex(missing).to_numpy(),
+                              "last_seen": self.last_seen.reindex(missing).to_numpy()}),
+            ], ignore_index=True)
+
+            summary = f"{(joined['issue'] == '').sum()} consistent"
+            for issue, count in issues["issue"].value_counts().items():
+                summary += f", {count} {issue}"
+            gap_note = f", gap of {gap_days} day(s) since {self.date}" if gap_days else ""
+            print(f"[Reconcile] {date_str}: {summary}{gap_note}")
+
+            if fill and gap_days > 0:
+                # Only talukas present in the previous bulletin span exactly this gap
+                fillable = (joined["issue"] == "") & (last_seen == previous_day)
+                filled = self._fill_gap(previous_day, gap_days, joined[fillable])
+
+        self.date = date_str
+        # Talukas missing today keep their last total and last-seen date
+        self.totals = today["total_rainfall"].combine_first(self.totals)
+        self.last_seen = pd.Series(date_str, index=today.index, dtype=object).combine_first(self.last_seen)
+        return issues, filled
+
+    @staticmethod
+    def _fill_gap(previous_day: datetime, gap_days: int, joined: pd.DataFrame) -> Dict[str, List[Dict]]:
+        """
+        Linearly interpolates cumulative totals across the missing days: the last missing
+        day ends at the new bulletin's `rain_till_yesterday`.
+        """
+        start = joined["previous_total"].to_numpy(dtype=float)
+        end = joined["rain_till_yesterday"].to_numpy(dtype=float)
+        fractions = np.arange(gap_days + 1)[:, None] / gap_days
+        totals = start[None, :] + (end - start)[None, :] * fractions     # (gap_days + 1, talukas)
+        average = joined["avg_rain_1995_2024"].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percent = np.where(average > 0, totals / average * 100, 0.0)
+
+        filled = {}
+        for k in range(1, gap_days + 1):
+            date_str = (previous_day + pd.Timedelta(days=k)).strftime(DATE_FORMAT)
+            frame = pd.DataFrame({
+                "region": joined["region"].to_numpy(),
+                "district": joined["district"].to_numpy(),
+                "sr_no": joined["sr_no"].fillna(0.0).to_numpy(),
+                "taluka": joined["taluka"].to_numpy(),
+                "avg_rain_1995_2024": joined["avg_rain_1995_2024"].fillna(0.0).to_numpy(),
+                "rain_till_yesterday": totals[k - 1],
+                "rain_last_24hrs": totals[k] - totals[k - 1],
+                "total_rainfall": totals[k],
+                "percent_against_avg": percent[k],
+                "date": date_str,
+                "taluka_lc": joined["taluka"].str.lower().to_numpy(),
+                ESTIMATED_FIELD: True,
+            })
+            records = frame.round(2).to_dict("records")
+            for record in records:
+                record[HASH_FIELD] = content_hash(record)
+            filled[date_str] = records
+        return filled
+
+
+def reconcile_dates(reconciler: CrossDayReconciler, rows_by_date: Dict[str, List[Dict]],
+                    fill: bool = False) -> Tuple[pd.DataFrame, Dict[str, List[Dict]]]:
+    """Reconciles several days in chronological order; returns all issues and filled records."""
+    all_issues, all_filled = [], {}
+    for date_str in sorted(rows_by_date, key=lambda d: datetime.strptime(d, DATE_FORMAT)):
+        issues, filled = reconciler.reconcile(date_str, rows_by_date[date_str], fill=fill)
+        if not issues.empty:
+            all_issues.append(issues.assign(date=date_str))
+        all_filled.update(filled)
+    if not all_issues:
+        return pd.DataFrame(columns=["date", "taluka_id", "issue"]), all_filled
+    return pd.concat(all_issues, ignore_index=True), all_filled
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the rainfall/reservoir ingest scripts.
+
+    python python-scripts/ingest_cli.py parse
+    python python-scripts/ingest_cli.py upload-rainfall --pipeline --snapshots
+    python python-scripts/ingest_cli.py upload-reservoir --bucketed
+    python python-scripts/ingest_cli.py verify
+    python python-scripts/ingest_cli.py --profile upload-rainfall --pipeline
+
+--profile runs the command under cProfile, writes the raw stats to
+profiles/<command>-<timestamp>.prof (or --profile-out PATH) and prints the top
+functions by cumulative time.
+Only the main process is profiled; pipeline parse workers run in their own processes.
+"""
+import os
+import sys
+import time
+import pstats
+import argparse
+import cProfile
+
+from pymongo import MongoClient
+
+PUBLIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "public")
+DEFAULT_DB_NAME = "rainfall-data"
+
+
+def get_database(args):
+    if not args.mongo_uri:
+        raise RuntimeError('Please set the MONGODB_URI environment variable or pass --mongo-uri.')
+    return MongoClient(args.mongo_uri)[args.db_name]
+
+
+def cmd_parse(args) -> int:
+    from batch_pdf_to_mongo import convert_pdfs_to_csvs
+    from run_journal import RunJournal
+    journal = RunJournal(args.pdf_dir, resume=args.resume)
+    convert_pdfs_to_csvs(args.pdf_dir, quarantine=args.quarantine, journal=journal)
+    journal.print_summary()
+    return 0
+
+
+def cmd_upload_rainfall(args) -> int:
+    db = get_database(args)
+    if args.from_csv_dir:
+        from upload_csvs_to_mongodb import upload_rainfall_csvs
+        upload_rainfall_csvs(db, args.rainfall_dir, compact=args.compact, diff=args.diff, dry_run=args.dry_run)
+        return 0
+
+    from batch_pdf_to_mongo import run_batch
+    run_batch(db, args.pdf_dir, pipeline=args.pipeline, keep_csv=args.keep_csv, compact=args.compact,
+              diff=args.diff, dry_run=args.dry_run, quarantine=args.quarantine, snapshots=args.snapshots,
+              reconcile=args.reconcile, fill_gaps=args.fill_gaps, resume=args.resume)
+    return 0
+
+
+def cmd_upload_reservoir(args) -> int:
+    from upload_reservoir_csvs_to_mongodb import upload_reservoir_csvs
+    upload_reservoir_csvs(get_database(args), args.reservoir_dir, bucketed=args.bucketed)
+    return 0
+
+
+def cmd_verify(args) -> int:
+    from schema_manager import check_schema
+    return check_schema(get_database(args), provision=not args.verify_only)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Rainfall/reservoir ingest tools")
+    parser.add_argument("--mongo-uri", default=os.environ.get("MONGODB_URI"),
+                        help="MongoDB connection string (default: $MONGODB_URI)")
+    parser.add_argument("--db-name", default=DEFAULT_DB_NAME)
+    parser.add_argument("--pdf-dir", default=os.path.join(PUBLIC_DIR, "csvs"),
+                        help="Daily bulletin PDFs (and the CSVs parsed from them)")
+    parser.add_argument("--rainfall-dir", default=os.path.join(PUBLIC_DIR, "Rainfall"),
+                        help="Dated rainfall CSVs for upload-rainfall --from-csv-dir")
+    parser.add_argument("--reservoir-dir", default=os.path.join(PUBLIC_DIR, "extracted_data"),
+                        help="Reservoir CSVs")
+    parser.add_argument("--profile", action="store_true", help="Profile the command with cProfile")
+    parser.add_argument("--profile-out", metavar="PATH",
+                        help="Where --profile writes its .prof file (default: profiles/<command>-<time>.prof)")
+    parser.add_argument("--profile-top", type=int, default=25,
+                        help="Number of hot functions to print with --profile")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parse = commands.add_parser("parse", help="Convert bulletin PDFs to CSVs")
+    parse.add_argument("--quarantine", action="store_true",
+                       help="Drop rows failing arithmetic checks into quarantine/")
+    parse.add_argument("--resume", action="store_true",
+                       help="Skip PDFs an interrupted run already converted")
+    parse.set_defaults(func=cmd_parse)
+
+    rainfall = commands.add_parser("upload-rainfall", help="Parse bulletins and upload rainfall data")
+    rainfall.add_argument("--pipeline", action="store_true", help="Overlap parsing and database writes")
+    rainfall.add_argument("--keep-csv", action="store_true", help="Also write CSVs in --pipeline mode")
+    rainfall.add_argument("--compact", action="store_true",
+                          help="Normalized taluka references + compact daily facts")
+    rainfall.add_argument("--diff", action="store_true", help="Write only documents that changed")
+    rainfall.add_argument("--dry-run", action="store_true", help="Report the diff without writing")
+    rainfall.add_argument("--quarantine", action="store_true",
+                          help="Keep rows failing arithmetic checks out of MongoDB")
+    rainfall.add_argument("--snapshots", action="store_true", help="Refresh static per-date snapshots")
+    rainfall.add_argument("--reconcile", action="store_true",
+                          help="Check rain_till_yesterday against the previous day's totals")
+    rainfall.add_argument("--fill-gaps", action="store_true",
+                          help="With --reconcile, write estimated records for missing days")
+    rainfall.add_argument("--resume", action="store_true",
+                          help="Skip files an interrupted run already parsed/uploaded; retry failures")
+    rainfall.add_argument("--from-csv-dir", action="store_true",
+                          help="Replace the collection from --rainfall-dir CSVs instead of parsing PDFs")
+    rainfall.set_defaults(func=cmd_upload_rainfall)
+
+    reservoir = commands.add_parser("upload-reservoir", help="Upload reservoir CSVs")
+    reservoir.add_argument("--bucketed", action="store_true",
+                           help="One document per reservoir per month")
+    reservoir.set_defaults(func=cmd_upload_reservoir)
+
+    verify = commands.add_parser("verify", help="Check that canonical queries use indexes")
+    # Provision by default like schema_manager.py: the API's taluka search only
+    # queries taluka_lc, so documents written before it existed need the backfill
+    verify.add_argument("--verify-only", action="store_true",
+                        help="Only check query plans; skip creating indexes and backfilling taluka_lc")
+    verify.set_defaults(func=cmd_verify)
+
+    return parser
+
+
+def run_profiled(args) -> int:
+    """Runs the selected command under cProfile and reports where the time went."""
+    stats_path = args.profile_out or os.path.join(
+        "profiles", f"{args.command}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+    os.makedirs(os.path.dirname(stats_path) or ".", exist_ok=True)
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        result = profiler.runcall(args.func, args)
+    finally:
+        elapsed = time.perf_counter() - start
+        profiler.dump_stats(stats_path)
+        print(f"\n[Profile] {args.command} took {elapsed:.2f}s; stats written to {stats_path}")
+        print(f"[Profile] Top {args.profile_top} functions by cumulative time:")
+        pstats.Stats(stats_path).strip_dirs().sort_stats("cumulative").print_stats(args.profile_top)
+    return result
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        return run_profiled(args)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from parser import FixedRainfallParser
+from bulletin_validation import validate_parsed_pdf
+from batch_pdf_to_mongo import dataframe_to_records, extract_date_from_csv
+
+# Parser instance reused by each worker process across PDFs
+_worker_parser: Optional[FixedRainfallParser] = None
+
+
+def _parse_pdf(pdf_path: str, keep_csv: bool = False, quarantine: bool = False) -> Tuple[str, Optional[str], List[Dict]]:
+    """Runs in a worker process: PDF -> (filename, date, records) with no CSV round-trip."""
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = FixedRainfallParser(debug=False)
+
+    fname = os.path.basename(pdf_path)
+    df = _worker_parser.process_pdf_to_dataframe(pdf_path)
+    df = validate_parsed_pdf(df, pdf_path, quarantine=quarantine)
+    if df.empty:
+        return fname, None, []
+
+    if keep_csv:
+        _worker_parser.save_to_csv(df, pdf_path.replace(".pdf", ".csv"))
+
+    date_str = extract_date_from_csv(df, fallback_filename=fname)
+    if not date_str:
+        return fname, None, []
+    return fname, date_str, dataframe_to_records(df, date_str)
+
+
+async def run_pipeline(write_records: Callable[[str, List[Dict]], int], pdf_dir: str, keep_csv: bool = False,
+                       parse_workers: Optional[int] = None, write_workers: int = 2,
+                       queue_size: int = 4, quarantine: bool = False, journal=None) -> int:
+    """
+    Parses PDFs in a process pool while writer tasks upload finished dates to MongoDB
+    through `write_records(date_str, records)`.
+
+    At most `parse_workers` PDFs are parsed and `queue_size` parsed dates wait for a
+    writer at any time: a parse slot is only released once its batch is queued, so a
+    slow database stalls parsing instead of piling records up in memory.
+
+    With a `journal` (RunJournal), PDFs already uploaded by an earlier run are skipped
+    and each file's parse/upload completion or failure is recorded.
+    """
+    loop = asyncio.get_running_loop()
+    parse_workers = parse_workers or os.cpu_count() or 1
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    parse_slots = asyncio.Semaphore(parse_workers)
+    totals = {"records": 0, "dates": 0}
+    # Two PDFs for the same date must not interleave their delete/insert
+    date_locks: Dict[str, asyncio.Lock] = {}
+
+    pdf_paths = sorted(
+        os.path.join(pdf_dir, fname) for fname in os.listdir(pdf_dir)
+        if fname.lower().endswith(".pdf")
+    )
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool, \
+            ThreadPoolExecutor(max_workers=write_workers) as write_pool:
+
+        async def produce(pdf_path: str):
+            fname = os.path.basename(pdf_path)
+            if journal:
+                journal.sync(pdf_path)
+                if journal.is_done(fname, "uploaded"):
+                    print(f"[PDF→MongoDB] {fname} already uploaded, skipping")
+                    return
+            async with parse_slots:
+                print(f"[PDF→MongoDB] Parsing {fname} ...")
+                try:
+                    fname, date_str, records = await loop.run_in_executor(
+                        parse_pool, _parse_pdf, pdf_path, keep_csv, quarantine)
+                except Exception as e:
+                    if journal:
+                        journal.fail(fname, "parsed", str(e))
+                    print(f"[PDF→MongoDB] Error processing {fname}: {e}")
+                    return
+                if journal:
+                    journal.mark(fname, "parsed")
+                    if keep_csv and records:
+                        journal.mark(fname, "csv")
+                if not date_str:
+                    print(f"[PDF→MongoDB] No data or date extracted from {fname}")
+                    return
+                if not records:
+                    print(f"[PDF→MongoDB] No valid records found in {fname}")
+                    return
+                await queue.put((fname, date_str, records))
+
+        async def consume():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    queue.task_done()
+                    return
+                fname, date_str, records = item
+                try:
+                    # pymongo is blocking, so writes run in a thread to keep the loop free
+                    async with date_locks.setdefault(date_str, asyncio.Lock()):
+                        count = await loop.run_in_executor(
+                            write_pool, write_records, date_str, records)
+                    totals["records"] += count
+                    totals["dates"] += 1
+                    if journal:
+                        journal.mark(fname, "uploaded", date=date_str, records=count)
+                    print(f"[PDF→MongoDB] Uploaded {count} records from {fname} (date: {date_str})")
+                except Exception as e:
+                    if journal:
+                        journal.fail(fname, "uploaded", str(e))
+                    print(f"[PDF→MongoDB] Error uploading {fname} (date: {date_str}): {e}")
+                finally:
+                    queue.task_done()
+
+        writers = [asyncio.create_task(consume()) for _ in range(write_workers)]
+        await asyncio.gather(*(produce(path) for path in pdf_paths))
+        for _ in writers:
+            await queue.put(None)
+        await asyncio.gather(*writers)
+
+    print(f"[PDF→MongoDB] Pipeline finished: {totals['dates']} dates, {totals['records']} records")
+    return totals["records"]
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+SQLite-backed queue for bulletin uploads.
+
+Uploads are enqueued with their PDF bytes; a fixed pool of worker processes parses and
+writes them, so a burst of uploads never runs more than `--workers` pdfplumber processes.
+A PDF whose SHA-256 is already queued or running is not enqueued again: the caller gets
+the existing job id back. Workers heartbeat their running job; the serving process
+requeues jobs whose heartbeat stopped (crashed worker) and restarts dead workers, so a
+job is never left 'running' forever and re-uploads are never deduplicated onto it.
+
+    python ingest_queue.py enqueue <pdf_path> <date>   -> {"job_id": 3, "deduplicated": false}
+    python ingest_queue.py status <job_id>
+    python ingest_queue.py serve [--workers 2] [--quarantine]
+    python ingest_queue.py metrics
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+import traceback
+import multiprocessing
+from typing import Dict, Optional, Tuple
+
+QUEUE_DB = os.environ.get(
+    "INGEST_QUEUE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ingest_queue.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pdf_sha256 TEXT NOT NULL,
+    date TEXT NOT NULL,
+    pdf BLOB,
+    status TEXT NOT NULL DEFAULT 'queued',
+    records INTEGER,
+    error TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    finished_at REAL
+);
+-- At most one live job per PDF: enforces in-flight deduplication atomically
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_live_pdf ON jobs (pdf_sha256) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+STATUS_FIELDS = ["id", "pdf_sha256", "date", "status", "records", "error",
+                 "enqueued_at", "started_at", "heartbeat_at", "attempts", "finished_at"]
+
+HEARTBEAT_INTERVAL = 10
+# A running job whose heartbeat is older than this belongs to a dead worker
+STALE_AFTER = 60
+# Jobs that kept killing their worker are failed instead of requeued again
+MAX_ATTEMPTS = 3
+
+
+class IngestQueue:
+
+    def __init__(self, path: str = QUEUE_DB):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        # Queue databases created before heartbeats were tracked
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "heartbeat_at" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+        if "attempts" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    def enqueue(self, pdf_bytes: bytes, date: str) -> Tuple[int, bool]:
+        """Queues a PDF for `date`; returns (job_id, deduplicated)."""
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        try:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (pdf_sha256, date, pdf, enqueued_at) VALUES (?, ?, ?, ?)",
+                (digest, date, sqlite3.Binary(pdf_bytes), time.time()))
+            return cursor.lastrowid, False
+        except sqlite3.IntegrityError:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE pdf_sha256 = ? AND status IN ('queued', 'running')",
+                (digest,)).fetchone()
+            if row is None:
+                # The live job finished between the insert and the lookup; queue a fresh one
+                return self.enqueue(pdf_bytes, date)
+            return row["id"], True
+
+    def claim_next(self) -> Optional[Dict]:
+        """
+        Atomically moves the oldest queued job to running and returns it. Its `attempt`
+        number identifies this claim: heartbeats and results of an older claim are ignored.
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute(
+                "SELECT id, date, pdf, attempts FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            job = None
+            if row is not None:
+                now = time.time()
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, "
+                    "attempts = attempts + 1 WHERE id = ?", (now, now, row["id"]))
+                job = {"id": row["id"], "date": row["date"], "pdf": row["pdf"], "attempt": row["attempts"] + 1}
+            self._conn.execute("COMMIT")
+            return job
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    # Only the current claim of a running job may touch it: a worker wrongly presumed dead
+    # must not finish (or drop the PDF of) a job that was requeued or claimed again
+    _OWNED = "id = ? AND status = 'running' AND attempts = ?"
+
+    def heartbeat(self, job_id: int, attempt: int):
+        self._conn.execute(f"UPDATE jobs SET heartbeat_at = ? WHERE {self._OWNED}",
+                           (time.time(), job_id, attempt))
+
+    def complete(self, job_id: int, attempt: int, records: int) -> bool:
+        """Marks the claim done; False if the job is no longer held by this claim."""
+        # The PDF is no longer needed once it has been written to MongoDB
+        cursor = self._conn.execute(
+            f"UPDATE jobs SET status = 'done', records = ?, pdf = NULL, finished_at = ? WHERE {self._OWNED}",
+            (records, time.time(), job_id, attempt))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, attempt: int, error: str) -> bool:
+        cursor = self._conn.execute(
+            f"UPDATE jobs SET status = 'failed', error = ?, pdf = NULL, finished_at = ? WHERE {self._OWNED}",
+            (error, time.time(), job_id, attempt))
+        return cursor.rowcount == 1
+
+    def requeue_stale(self, older_than: float = STALE_AFTER) -> int:
+        """
+        Puts jobs whose worker stopped heartbeating back in the queue, or fails them once
+        they have used up MAX_ATTEMPTS. Returns the number of jobs requeued.
+        """
+        cutoff = time.time() - older_than
+        stale = "status = 'running' AND COALESCE(heartbeat_at, started_at) < ?"
+        self._conn.execute(
+            f"UPDATE jobs SET status = 'failed', error = 'worker died ' || attempts || ' times', "
+            f"pdf = NULL, finished_at = ? WHERE {stale} AND attempts >= ?",
+            (time.time(), cutoff, MAX_ATTEMPTS))
+        cursor = self._conn.execute(
+            f"UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL "
+            f"WHERE {stale} AND pdf IS NOT NULL", (cutoff,))
+        return cursor.rowcount
+
+    def status(self, job_id: int) -> Optional[Dict]:
+        row = self._conn.execute(
+            f"SELECT {', '.join(STATUS_FIELDS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        status = dict(row)
+        if status["status"] == "queued":
+            status["position"] = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?", (job_id,)).fetchone()[0]
+        return status
+
+    def metrics(self, window: int = 100) -> Dict:
+        """Queue depth plus wait/run latency percentiles over the last `window` finished jobs."""
+        counts = {row["status"]: row["n"] for row in self._conn.execute(
+            "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+        finished = self._conn.execute(
+            "SELECT started_at - enqueued_at AS wait, finished_at - started_at AS run FROM jobs "
+            "WHERE status IN ('done', 'failed') AND started_at IS NOT NULL "
+            "ORDER BY finished_at DESC LIMIT ?", (window,)).fetchall()
+        oldest = self._conn.execute("SELECT MIN(enqueued_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+        def percentiles(values):
+            if not values:
+                return None
+            values = sorted(values)
+            pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))], 3)
+            return {"p50": pick(0.5), "p95": pick(0.95), "max": round(values[-1], 3)}
+
+        return {
+            "depth": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_queued_age": round(time.time() - oldest, 3) if oldest else None,
+            "wait_seconds": percentiles([row["wait"] for row in finished]),
+            "run_seconds": percentiles([row["run"] for row in finished]),
+        }
+
+
+def process_job(date: str, pdf_bytes: bytes, collection, source_path: str, quarantine: bool = False) -> int:
+    """
+    Parses one queued PDF and replaces that date's documents; returns the record count.
+    Rows go through the same validation hook as batch and pipeline ingest; quarantined
+    rows land in quarantine/ next to `source_path`.
+    """
+    from parser import FixedRainfallParser
+    from bulletin_validation import validate_parsed_pdf
+    from batch_pdf_to_mongo import dataframe_to_records, write_date_records
+
+    df = FixedRainfallParser(debug=False).process_pdf_to_dataframe(pdf_bytes)
+    df = validate_parsed_pdf(df, source_path, quarantine=quarantine)
+    if df.empty:
+        raise ValueError("No data extracted from PDF")
+    # Replacing the date (rather than inserting) keeps a re-uploaded bulletin from doubling up
+    return write_date_records(collection, date, dataframe_to_records(df, date))
+
+
+def _heartbeat_loop(queue_path: str, job_id: int, attempt: int, done: threading.Event):
+    # Own connection: sqlite3 connections are not shared across threads
+    queue = IngestQueue(queue_path)
+    while not done.wait(HEARTBEAT_INTERVAL):
+        queue.heartbeat(job_id, attempt)
+
+
+def _worker_loop(queue_path: str, mongo_uri: str, poll_interval: float, quarantine: bool = False):
+    from pymongo import MongoClient
+    from batch_pdf_to_mongo import COLLECTION_NAME, DB_NAME
+
+    queue = IngestQueue(queue_path)
+    collection = MongoClient(mongo_uri)[DB_NAME][COLLECTION_NAME]
+    while True:
+        job = queue.claim_next()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        logging.info(f"[Queue] Job {job['id']} started (date: {job['date']})")
+        done = threading.Event()
+        beat = threading.Thread(target=_heartbeat_loop, args=(queue_path, job["id"], job["attempt"], done),
+                                daemon=True)
+        beat.start()
+        # Quarantine files are named after the job, next to the queue database
+        source_path = os.path.join(os.path.dirname(os.path.abspath(queue_path)), f"job-{job['id']}-{job['date']}.pdf")
+        try:
+            records = process_job(job["date"], bytes(job["pdf"]), collection, source_path, quarantine=quarantine)
+            if queue.complete(job["id"], job["attempt"], records):
+                logging.info(f"[Queue] Job {job['id']} done: {records} records")
+            else:
+                logging.warning(f"[Queue] Job {job['id']} was reclaimed while running; result not recorded")
+        except Exception as e:
+            if queue.fail(job["id"], job["attempt"], f"{e}\n{traceback.format_exc()}"):
+                logging.error(f"[Queue] Job {job['id']} failed: {e}")
+            else:
+                logging.warning(f"[Queue] Job {job['id']} was reclaimed while running; failure not recorded: {e}")
+        finally:
+            done.set()
+            beat.join()
+
+
+def serve(queue_path: str = QUEUE_DB, workers: int = 2, poll_interval: float = 1.0, quarantine: bool = False):
+    """
+    Runs a fixed pool of worker processes until interrupted. Every poll it restarts
+    workers that died and requeues jobs whose heartbeat went stale. With `quarantine`,
+    rows failing the bulletin checks are kept out of MongoDB (they are always reported).
+    """
+    mongo_uri = os.environ.get('MONGODB_URI')
+    if not mongo_uri:
+        raise RuntimeError('Please set the MONGODB_URI environment variable.')
+    queue = IngestQueue(queue_path)
+
+    def start_worker():
+        process = multiprocessing.Process(target=_worker_loop, args=(queue_path, mongo_uri, poll_interval, quarantine),
+                                          daemon=True)
+        process.start()
+        return process
+
+    processes = [start_worker() for _ in range(workers)]
+    logging.info(f"[Queue] Serving {queue_path} with {workers} workers")
+    try:
+        while True:
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    logging.warning(f"[Queue] Worker {process.pid} exited ({process.exitcode}); restarting")
+                    processes[i] = start_worker()
+            requeued = queue.requeue_stale()
+            if requeued:
+                logging.info(f"[Queue] Requeued {requeued} jobs whose worker stopped heartbeating")
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulletin ingest job queue")
+    parser.add_argument("--queue-db", default=QUEUE_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue = commands.add_parser("enqueue")
+    enqueue.add_argument("pdf_path")
+    enqueue.add_argument("date")
+    status = commands.add_parser("status")
+    status.add_argument("job_id", type=int)
+    run = commands.add_parser("serve")
+    run.add_argument("--workers", type=int, default=2)
+    run.add_argument("--poll-interval", type=float, default=1.0)
+    run.add_argument("--quarantine", action="store_true",
+                     help="Keep rows failing the bulletin checks out of MongoDB (written to quarantine/)")
+    commands.add_parser("metrics")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.queue_db, args.workers, args.poll_interval, quarantine=args.quarantine)
+        return 0
+
+    queue = IngestQueue(args.queue_db)
+    if args.command == "enqueue":
+        with open(args.pdf_path, "rb") as f:
+            job_id, deduplicated = queue.enqueue(f.read(), args.date)
+        print(json.dumps({"job_id": job_id, "deduplicated": deduplicated}))
+    elif args.command == "status":
+        status = queue.status(args.job_id)
+        print(json.dumps(status))
+        return 0 if status else 1
+    elif args.command == "metrics":
+        print(json.dumps(queue.metrics()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,16 @@
+import io
 import os
+import mmap
 import pandas as pd
 import pdfplumber
 import re
 from pathlib import Path
 import logging
-from typing import List, Dict, Tuple
+from typing import BinaryIO, List, Dict, Tuple, Union
+from taluka_matcher import TalukaMatcher
+
+# A path, raw PDF bytes, or an open binary stream (BytesIO, file object, mmap)
+PdfSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO, mmap.mmap]
 
 # Configure logging for clear feedback
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -47,35 +53,36 @@ class FixedRainfallParser:
             'Gandhinagar': ['Dehgam', 'Gandhinagar', 'Kalol(Gandhinagar)', 'Mansa'],
             
             # East Central Gujarat region
-            'Ahmedabad': ['Ahmedabad City', 'Bavla', 'Daskroi', 'Dhandhuka', 'Dholera', 
+            'Ahmedabad': ['Ahmedabad City', 'Bavla', 'Daskroi', 'Detroj Rampura', 'Dhandhuka', 'Dholera', 
                          'Dholka', 'Mandal', 'Sanand', 'Viramgam'],
-            'Anand': ['Anand', 'Borsad', 'Khambhat', 'Petlad', 'Sojitra', 'Tarapur', 'Umreth'],
-            'Kheda': ['Kapadvanj', 'Kathlal', 'Kheda', 'Matar', 'Mehmedabad', 'Nadiad', 'Thasra'],
+            'Anand': ['Anand', 'Anklav', 'Borsad', 'Khambhat', 'Petlad', 'Sojitra', 'Tarapur', 'Umreth'],
+            'Kheda': ['Galteshwar', 'Kapadvanj', 'Kathlal', 'Kheda', 'Matar', 'Mehmedabad', 'Nadiad',
+                     'Thasra', 'Vaso'],
             'Panchmahal': ['Ghoghamba', 'Godhra', 'Halol', 'Jambughoda', 'Kalol', 'Lunawada', 
                           'Morwa (Hadaf)', 'Santrampur', 'Shehera'],
-            'Dahod': ['Dahod', 'Devgadbaria', 'Fatepura', 'Garbada', 'Jhalod', 'Limkheda', 
+            'Dahod': ['Dahod', 'Devgadbaria', 'Dhanpur', 'Fatepura', 'Garbada', 'Jhalod', 'Limkheda', 
                      'Sanjeli', 'Singvad'],
-            'Vadodara': ['Dabhoi', 'Karjan', 'Padra', 'Sankheda', 'Savli', 'Vadodara', 'Vaghodia'],
+            'Vadodara': ['Dabhoi', 'Desar', 'Karjan', 'Padra', 'Sankheda', 'Savli', 'Vadodara', 'Vaghodia'],
             'Chhota Udepur': ['Bodeli', 'Chhota Udepur', 'Jetpur Pavi', 'Kavant', 'Nasvadi', 'Sankheda'],
-            'Mahisagar': ['Balasinor', 'Khanpur', 'Lunawada', 'Santrampur', 'Virpur'],
+            'Mahisagar': ['Balasinor', 'Kadana', 'Khanpur', 'Lunawada', 'Santrampur', 'Virpur'],
             
             # Saurashtra region
-            'Rajkot': ['Dhoraji', 'Gondal', 'Jasdan', 'Jetpur', 'Kotda Sangani', 'Lodhika', 
-                      'Morbi', 'Paddhari', 'Rajkot', 'Tankara', 'Wankaner'],
+            'Rajkot': ['Dhoraji', 'Gondal', 'Jamkandorna', 'Jasdan', 'Jetpur', 'Kotda Sangani', 'Lodhika', 
+                      'Morbi', 'Paddhari', 'Rajkot', 'Tankara', 'Upleta', 'Vinchhiya', 'Wankaner'],
             'Jamnagar': ['Dhrol', 'Jamnagar', 'Jodiya', 'Kalavad', 'Khambhalia', 'Lalpur'],
             'Porbandar': ['Kutiyana', 'Porbandar', 'Ranavav'],
             'Junagadh': ['Bhesan', 'Junagadh', 'Junagadh City', 'Keshod', 'Maliya Hatina', 
                         'Manavadar', 'Mangrol(Junagadh)', 'Mendarda', 'Talala', 'Vanthali', 'Visavadar'],
             'Amreli': ['Amreli', 'Babra', 'Dhari', 'Jafrabad', 'Kunkavav Vadia', 'Lathi', 
                       'Lilia', 'Rajula', 'Savarkundla', 'Bagasara'],
-            'Bhavnagar': ['Bhavnagar', 'Gariadhar', 'Ghogha', 'Mahuva (Bhavnagar)', 'Palitana', 
+            'Bhavnagar': ['Bhavnagar', 'Gariadhar', 'Ghogha', 'Jesar', 'Mahuva (Bhavnagar)', 'Palitana', 
                          'Shihor', 'Talaja', 'Umrala', 'Vallabhipur'],
             'Botad': ['Barwala', 'Botad', 'Gadhada', 'Ranpur'],
             'Gir Somnath': ['Gir Gadhada', 'Kodinar', 'Patan-Veraval', 'Sutrapada', 'Una'],
-            'Devbhumi Dwarka': ['Bhanvad', 'Dwarka', 'Jamjodhpur', 'Khambha'],
+            'Devbhumi Dwarka': ['Bhanvad', 'Dwarka', 'Jamjodhpur', 'Kalyanpur', 'Khambha'],
             'Morbi': ['Halvad', 'Maliya', 'Morbi', 'Thangadh', 'Wankaner'],
             'Surendranagar': ['Chuda', 'Chotila', 'Dasada', 'Dhrangadhra', 'Halvad', 'Lakhtar', 
-                             'Limbdi', 'Muli', 'Sayla', 'Wadhwan'],
+                             'Limbdi', 'Muli', 'Patdi', 'Sayla', 'Wadhwan'],
             
             # South Gujarat region
             'Surat': ['Bardoli', 'Chorasi', 'Kamrej', 'Mandvi', 'Olpad', 'Palsana', 'Surat City', 
@@ -89,6 +96,12 @@ class FixedRainfallParser:
             'Dang': ['Dang-Ahwa', 'Vaghai']
         }
 
+        # Fuzzy lookup for taluka spellings that are not in the mappings verbatim; only
+        # resolved within the district being parsed (see _resolve_taluka_name)
+        self.taluka_matcher = TalukaMatcher(
+            taluka for talukas in self.district_mappings.values() for taluka in talukas
+        )
+
         # Enhanced regex patterns
         self.region_pattern = re.compile(
             r'^\s*(KACHCHH|NORTH GUJARAT|EAST-CENTRAL GUJARAT|SAURASHTRA|SOUTH GUJARAT)\s*$', 
@@ -128,6 +141,15 @@ class FixedRainfallParser:
         # Clean up spacing
         return re.sub(r'\s+', ' ', name).strip()
 
+    def _resolve_taluka_name(self, name: str, current_district: str) -> str:
+        """
+        Maps a parsed taluka name onto its known spelling. A misspelling is only resolved to a
+        taluka of `current_district`, so an unlisted taluka is kept as-is instead of being
+        renamed (and moved) to a similar-looking taluka elsewhere.
+        """
+        district_talukas = self.district_mappings.get(current_district, [])
+        return self.taluka_matcher.match(name, within=district_talukas) or name
+
     def _is_header_or_useless(self, line: str) -> bool:
         """Identifies and skips header lines and useless rows."""
         line_upper = line.upper().strip()
@@ -189,12 +211,23 @@ class FixedRainfallParser:
         normalized_name = self._normalize_name(name)
         return normalized_name in self.district_mappings
 
-    def _extract_columns_from_pdf(self, pdf_path: str) -> List[str]:
+    @staticmethod
+    def _as_pdfplumber_input(pdf_source: PdfSource):
+        """Paths become str (checked to exist); bytes are wrapped in BytesIO; streams pass through."""
+        if isinstance(pdf_source, (str, os.PathLike)):
+            if not Path(pdf_source).exists():
+                raise FileNotFoundError(f"PDF file not found at '{pdf_source}'")
+            return str(pdf_source)
+        if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+            return io.BytesIO(pdf_source)
+        return pdf_source
+
+    def _extract_columns_from_pdf(self, pdf_source: PdfSource) -> List[str]:
         """Extracts text from PDF with better column separation."""
         logging.info("Extracting text and separating columns...")
         all_columns_text = []
         
-        with pdfplumber.open(pdf_path) as pdf:
+        with pdfplumber.open(self._as_pdfplumber_input(pdf_source)) as pdf:
             for i, page in enumerate(pdf.pages):
                 # More precise column separation
                 page_width = page.width
@@ -288,7 +321,7 @@ class FixedRainfallParser:
             data_with_srno_match = self.data_pattern_with_srno.match(line)
             if data_with_srno_match:
                 groups = data_with_srno_match.groups()
-                taluka_name = self._normalize_name(groups[1])
+                taluka_name = self._resolve_taluka_name(self._normalize_name(groups[1]), current_district)
                 
                 # CRITICAL: Determine correct district for this taluka
                 correct_district = self._get_district_for_taluka(taluka_name, current_region)
@@ -312,7 +345,7 @@ class FixedRainfallParser:
             data_no_srno_match = self.data_pattern_no_srno.match(line)
             if data_no_srno_match:
                 groups = data_no_srno_match.groups()
-                taluka_name = self._normalize_name(groups[0])
+                taluka_name = self._resolve_taluka_name(self._normalize_name(groups[0]), current_district)
                 
                 # CRITICAL: Determine correct district for this taluka
                 correct_district = self._get_district_for_taluka(taluka_name, current_region)
@@ -350,12 +383,12 @@ class FixedRainfallParser:
         }
         return parsed_data, new_context
 
-    def process_pdf_to_dataframe(self, pdf_path: str) -> pd.DataFrame:
-        """Main processing function with enhanced Gandhinagar handling."""
-        if not Path(pdf_path).exists():
-            raise FileNotFoundError(f"PDF file not found at '{pdf_path}'")
-
-        column_texts = self._extract_columns_from_pdf(pdf_path)
+    def process_pdf_to_dataframe(self, pdf_source: PdfSource) -> pd.DataFrame:
+        """
+        Main processing function with enhanced Gandhinagar handling.
+        Accepts a path or the PDF in memory (bytes, BytesIO, mmap), so uploads never touch disk.
+        """
+        column_texts = self._extract_columns_from_pdf(pdf_source)
         
         all_data = []
         context = {"current_region": "Unknown", "current_district": "Unknown"}
@@ -392,6 +425,8 @@ class FixedRainfallParser:
         df.loc[df['taluka'] == 'Kalol(Gnr)', 'taluka'] = 'Kalol(Gandhinagar)'
         
         logging.info(f"Successfully processed PDF. Total records: {len(df)}")
+        if self.taluka_matcher.resolutions:
+            logging.info(f"Fuzzy taluka resolutions so far: {len(self.taluka_matcher.resolutions)}")
         
         # DEBUGGING: Check if Gandhinagar taluka is present
         gandhinagar_talukas = df[df['district'] == 'Gandhinagar']['taluka'].unique()
@@ -421,11 +456,12 @@ class FixedRainfallParser:
 
 
 if __name__ == '__main__':
-    dir=r'D:\Projects\Table Extractor'
-    # for i in os.listdir(dir):
-        # if os.path.isfile(i) and i.lower().endswith('18th June.pdf'):
-    PDF_FILE_PATH = r"D:\Projects\Table Extractor\18th June.pdf"
-    OUTPUT_CSV_PATH = f'{PDF_FILE_PATH[:-4]}.csv'
+    import sys
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python parser.py <pdf_path> [output_csv_path]")
+        sys.exit(1)
+    PDF_FILE_PATH = sys.argv[1]
+    OUTPUT_CSV_PATH = sys.argv[2] if len(sys.argv) == 3 else f'{os.path.splitext(PDF_FILE_PATH)[0]}.csv'
     parser = FixedRainfallParser(debug=False)  # Enable debug for Gandhinagar tracking
     try:
             rainfall_df = parser.process_pdf_to_dataframe(PDF_FILE_PATH)
@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+from pymongo import ASCENDING, UpdateOne
+
+BUCKET_COLLECTION = "reservoirbuckets"
+SCHEME_FIELD = "Name of Schemes"
+# Per-day values stored as arrays parallel to `dates` inside each monthly bucket
+METRIC_FIELDS = ["InflowinCusecs", "OutflowRiverinCusecs", "outflowCanalinCusecs", "PercentageFilling"]
+
+
+def month_key(date_str: str) -> Optional[str]:
+    """'21/06/2025' -> '2025-06'; None for dates standardize_date could not parse."""
+    try:
+        return datetime.strptime(date_str, "%d/%m/%Y").strftime("%Y-%m")
+    except (TypeError, ValueError):
+        return None
+
+
+def _clean(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return value
+
+
+def ensure_bucket_index(collection):
+    collection.create_index([(SCHEME_FIELD, ASCENDING), ("month", ASCENDING)], unique=True)
+
+
+def upsert_bucketed_records(collection, records: List[Dict]) -> int:
+    """
+    Folds per-reservoir daily rows into one document per reservoir per month.
+
+    Each bucket is created on first sight, then every day is either `$set` in place
+    (date already in the bucket, e.g. a corrected CSV) or `$push`ed onto the parallel
+    arrays, so re-running an upload never duplicates days. Returns rows written.
+    """
+    operations = []
+    seen_buckets = set()
+    written = 0
+
+    for record in records:
+        scheme = record.get(SCHEME_FIELD)
+        month = month_key(record.get("date"))
+        if not scheme or not month:
+            continue
+        bucket = {SCHEME_FIELD: scheme, "month": month}
+
+        if (scheme, month) not in seen_buckets:
+            seen_buckets.add((scheme, month))
+            empty_arrays = {field: [] for field in ["dates"] + METRIC_FIELDS}
+            operations.append(UpdateOne(bucket, {"$setOnInsert": {**empty_arrays, "count": 0}}, upsert=True))
+
+        values = {field: _clean(record.get(field)) for field in METRIC_FIELDS}
+        # Positional `$` resolves to the index matched in `dates` and applies to every parallel array
+        operations.append(UpdateOne(
+            {**bucket, "dates": record["date"]},
+            {"$set": {f"{field}.$": value for field, value in values.items()}},
+        ))
+        operations.append(UpdateOne(
+            {**bucket, "dates": {"$ne": record["date"]}},
+            {"$push": {"dates": record["date"], **values}, "$inc": {"count": 1}},
+        ))
+        written += 1
+
+    if operations:
+        collection.bulk_write(operations, ordered=True)
+    return written
+
+
+def get_reservoir_history(collection, scheme: str, start_month: Optional[str] = None,
+                          end_month: Optional[str] = None) -> List[Dict]:
+    """
+    Returns one reservoir's daily rows (legacy `reservoirdatas` shape) sorted by date,
+    reading a single bucket per month instead of one document per day.
+    """
+    query: Dict = {SCHEME_FIELD: scheme}
+    if start_month or end_month:
+        query["month"] = {}
+        if start_month:
+            query["month"]["$gte"] = start_month
+        if end_month:
+            query["month"]["$lte"] = end_month
+
+    rows = []
+    for bucket in collection.find(query, {"_id": 0}).sort("month", ASCENDING):
+        for i, date_str in enumerate(bucket.get("dates", [])):
+            row = {SCHEME_FIELD: scheme, "date": date_str}
+            for field in METRIC_FIELDS:
+                values = bucket.get(field, [])
+                row[field] = values[i] if i < len(values) else None
+            rows.append(row)
+    rows.sort(key=lambda r: datetime.strptime(r["date"], "%d/%m/%Y"))
+    return rows
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Rainfall -> reservoir response analysis.
+
+Each reservoir scheme in public/Metadata.csv is linked to the taluka it sits in; that
+taluka's daily rain (rainfalldatas.rain_last_24hrs) is paired with the reservoir's daily
+inflow and filling (reservoirdatas). For every reservoir at once this computes
+
+- lagged cross-correlation between rain on day t and inflow on day t + lag, and
+- the response of percentage filling to season-cumulative rain (least-squares slope, r^2).
+
+Results are kept as running sums (sufficient statistics) per reservoir in a .npz cache,
+so a run only loads dates newer than the cached state. The two series are uploaded
+separately, so the cache stops `--refold-days` before the last day both series have
+reached; that trailing window is re-read and re-folded every run, which picks up rows
+uploaded late. Corrections older than the window need --rebuild.
+
+    python reservoir_response.py [--max-lag 10] [--refold-days 14] [--rebuild] [--output response.csv]
+"""
+import os
+import sys
+import copy
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from taluka_matcher import DistrictTalukaResolver
+from taluka_reference import METADATA_CSV
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "reservoir_response.npz")
+DEFAULT_MAX_LAG = 10
+DEFAULT_REFOLD_DAYS = 14
+
+RAIN_DATE_FORMAT = "%d.%m.%Y"
+RESERVOIR_DATE_FORMAT = "%d/%m/%Y"
+SCHEME_FIELD = "Name of Schemes"
+
+# Running-sum slots: count, Σx, Σy, Σxy, Σx², Σy²
+_N, _SX, _SY, _SXY, _SXX, _SYY = range(6)
+
+
+def _parse_dates(values: List[str], fmt: str) -> Dict[str, datetime]:
+    parsed = {}
+    for value in values:
+        try:
+            parsed[value] = datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return parsed
+
+
+def link_reservoirs_to_talukas(rain_talukas: pd.DataFrame, metadata_path: str = METADATA_CSV) -> pd.DataFrame:
+    """
+    Scheme -> rainfall (district, taluka). Metadata.csv spellings are resolved district
+    first and then among that district's talukas only (a trailing '(District)' qualifier,
+    as in 'Mandvi(Kachchh)', is ignored), so a taluka missing from the rainfall data stays
+    unlinked instead of borrowing another's rain.
+    """
+    meta = pd.read_csv(metadata_path).dropna(subset=[SCHEME_FIELD, "Taluka"])
+    resolver = DistrictTalukaResolver(zip(rain_talukas["district"], rain_talukas["taluka"]))
+
+    districts, talukas = [], []
+    for district, taluka in zip(meta["District"], meta["Taluka"]):
+        linked = resolver.resolve(district, taluka)
+        districts.append(linked[0] if linked else None)
+        talukas.append(linked[1] if linked else None)
+
+    links = pd.DataFrame({
+        "scheme": meta[SCHEME_FIELD].astype(str).str.strip(),
+        "district": districts,
+        "taluka": talukas,
+    })
+    return links.drop_duplicates(subset=["scheme"]).reset_index(drop=True)
+
+
+def _accumulate(stats: np.ndarray, x: np.ndarray, y: np.ndarray):
+    """Adds the valid (x, y) pairs along the last axis into `stats` (slots on axis 0)."""
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    stats[_N] += valid.sum(axis=-1)
+    stats[_SX] += x.sum(axis=-1)
+    stats[_SY] += y.sum(axis=-1)
+    stats[_SXY] += (x * y).sum(axis=-1)
+    stats[_SXX] += (x * x).sum(axis=-1)
+    stats[_SYY] += (y * y).sum(axis=-1)
+
+
+def _pearson(stats: np.ndarray) -> np.ndarray:
+    n = stats[_N]
+    cov = n * stats[_SXY] - stats[_SX] * stats[_SY]
+    var_x = n * stats[_SXX] - stats[_SX] ** 2
+    var_y = n * stats[_SYY] - stats[_SY] ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = cov / np.sqrt(var_x * var_y)
+    return np.where(n >= 3, r, np.nan)
+
+
+class ResponseState:
+    """Per-reservoir running sums plus the last `max_lag` days of rain needed to extend lags."""
+
+    def __init__(self, schemes: np.ndarray, max_lag: int):
+        n = len(schemes)
+        self.schemes = schemes
+        self.max_lag = max_lag
+        self.last_date: Optional[datetime] = None
+        self.lag_stats = np.zeros((6, n, max_lag + 1))
+        self.response_stats = np.zeros((6, n))
+        self.cumulative_rain = np.zeros(n)
+        self.rain_tail = np.full((n, max_lag), np.nan)
+
+    @classmethod
+    def load(cls, path: str, max_lag: int) -> Optional["ResponseState"]:
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as cached:
+            if int(cached["max_lag"]) != max_lag:
+                return None
+            state = cls(cached["schemes"], max_lag)
+            state.last_date = datetime.fromisoformat(str(cached["last_date"]))
+            state.lag_stats = cached["lag_stats"]
+            state.response_stats = cached["response_stats"]
+            state.cumulative_rain = cached["cumulative_rain"]
+            state.rain_tail = cached["rain_tail"]
+        return state
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, schemes=self.schemes.astype(str), max_lag=self.max_lag,
+                 last_date=self.last_date.isoformat(), lag_stats=self.lag_stats,
+                 response_stats=self.response_stats, cumulative_rain=self.cumulative_rain,
+                 rain_tail=self.rain_tail)
+
+    def align_to(self, schemes: np.ndarray):
+        """Reorders state rows to `schemes`; reservoirs new to the cache start from zero."""
+        if np.array_equal(self.schemes, schemes):
+            return
+        position = {scheme: i for i, scheme in enumerate(self.schemes)}
+        source = np.array([position.get(scheme, -1) for scheme in schemes])
+        known = source >= 0
+        fresh = ResponseState(schemes, self.max_lag)
+        fresh.last_date = self.last_date
+        fresh.lag_stats[:, known] = self.lag_stats[:, source[known]]
+        fresh.response_stats[:, known] = self.response_stats[:, source[known]]
+        fresh.cumulative_rain[known] = self.cumulative_rain[source[known]]
+        fresh.rain_tail[known] = self.rain_tail[source[known]]
+        self.__dict__.update(fresh.__dict__)
+
+    def update(self, dates: List[datetime], rain: np.ndarray, inflow: np.ndarray, filling: np.ndarray):
+        """
+        Folds a contiguous block of new days into the running sums for every reservoir.
+        rain/inflow/filling are (reservoirs x days) with NaN for missing values.
+        """
+        n_days = len(dates)
+        lags = np.arange(self.max_lag + 1)
+
+        # rain_ext column k holds day (k - max_lag) relative to the block start
+        rain_ext = np.concatenate([self.rain_tail, rain], axis=1)
+        index = (self.max_lag - lags)[:, None] + np.arange(n_days)[None, :]
+        lagged_rain = rain_ext[:, index]                        # (reservoirs, lags, days)
+        _accumulate(self.lag_stats, lagged_rain, np.broadcast_to(inflow[:, None, :], lagged_rain.shape))
+
+        cumulative = self.cumulative_rain[:, None] + np.nancumsum(rain, axis=1)
+        _accumulate(self.response_stats, cumulative, filling)
+
+        self.cumulative_rain = cumulative[:, -1]
+        self.rain_tail = rain_ext[:, -self.max_lag:] if self.max_lag else self.rain_tail
+        self.last_date = dates[-1]
+
+    def summary(self, links: pd.DataFrame) -> pd.DataFrame:
+        correlations = _pearson(self.lag_stats)                # (reservoirs, lags)
+        has_corr = ~np.all(np.isnan(correlations), axis=1)
+        best_lag = np.where(has_corr, np.nanargmax(np.where(np.isnan(correlations), -np.inf, correlations), axis=1), -1)
+
+        s = self.response_stats
+        n = s[_N]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = (n * s[_SXY] - s[_SX] * s[_SY]) / (n * s[_SXX] - s[_SX] ** 2)
+            intercept = (s[_SY] - slope * s[_SX]) / n
+        r = _pearson(self.response_stats)
+
+        frame = pd.DataFrame({
+            "scheme": self.schemes,
+            "best_lag_days": best_lag,
+            "best_lag_corr": np.where(has_corr, correlations[np.arange(len(self.schemes)), best_lag], np.nan),
+            "filling_pct_per_100mm": slope * 100,
+            "filling_intercept_pct": intercept,
+            "response_r2": r ** 2,
+            "days": n.astype(int),
+        })
+        for lag in range(self.max_lag + 1):
+            frame[f"corr_lag_{lag}"] = correlations[:, lag]
+        return links.merge(frame, on="scheme", how="right")
+
+
+def _load_new_rain(db, after: Optional[datetime]) -> pd.DataFrame:
+    collection = db["rainfalldatas"]
+    dates = _parse_dates(collection.distinct("date"), RAIN_DATE_FORMAT)
+    wanted = [value for value, parsed in dates.items() if after is None or parsed > after]
+    rows = list(collection.find({"date": {"$in": wanted}},
+                                {"_id": 0, "district": 1, "taluka": 1, "date": 1, "rain_last_24hrs": 1}))
+    frame = pd.DataFrame(rows, columns=["district", "taluka", "date", "rain_last_24hrs"])
+    frame["date"] = frame["date"].map(dates)
+    return frame
+
+
+def _load_new_reservoir(db, after: Optional[datetime]) -> pd.DataFrame:
+    collection = db["reservoirdatas"]
+    dates = _parse_dates(collection.distinct("date"), RESERVOIR_DATE_FORMAT)
+    wanted = [value for value, parsed in dates.items() if after is None or parsed > after]
+    rows = list(collection.find({"date": {"$in": wanted}},
+                                {"_id": 0, SCHEME_FIELD: 1, "date": 1, "InflowinCusecs": 1, "PercentageFilling": 1}))
+    frame = pd.DataFrame(rows, columns=[SCHEME_FIELD, "date", "InflowinCusecs", "PercentageFilling"])
+    frame["date"] = frame["date"].map(dates)
+    return frame
+
+
+def build_matrices(links: pd.DataFrame, rain: pd.DataFrame, reservoir: pd.DataFrame,
+                   start: datetime, end: datetime) -> Tuple[List[datetime], np.ndarray, np.ndarray, np.ndarray]:
+    """Aligns both series on a contiguous daily axis with one row per linked reservoir."""
+    days = pd.date_range(start, end, freq="D")
+    rain_grid = (rain.pivot_table(index=["district", "taluka"], columns="date", values="rain_last_24hrs",
+                                  aggfunc="mean")
+                 .reindex(columns=days))
+    # Each reservoir takes its taluka's row (same-named talukas in two districts stay
+    # apart); unlinked reservoirs become all-NaN rows
+    rain_matrix = rain_grid.reindex(pd.MultiIndex.from_frame(links[["district", "taluka"]])).to_numpy(dtype=float)
+
+    def reservoir_grid(column):
+        values = pd.to_numeric(reservoir[column], errors="coerce")
+        return (reservoir.assign(value=values)
+                .pivot_table(index=SCHEME_FIELD, columns="date", values="value", aggfunc="mean")
+                .reindex(index=links["scheme"], columns=days).to_numpy(dtype=float))
+
+    return list(days.to_pydatetime()), rain_matrix, reservoir_grid("InflowinCusecs"), reservoir_grid("PercentageFilling")
+
+
+def run_analysis(db, max_lag: int = DEFAULT_MAX_LAG, cache_path: str = CACHE_PATH,
+                 rebuild: bool = False, refold_days: int = DEFAULT_REFOLD_DAYS) -> pd.DataFrame:
+    state = None if rebuild else ResponseState.load(cache_path, max_lag)
+    after = state.last_date if state else None
+
+    rain = _load_new_rain(db, after)
+    reservoir = _load_new_reservoir(db, after)
+    all_talukas = pd.DataFrame(
+        [group["_id"] for group in db["rainfalldatas"].aggregate(
+            [{"$group": {"_id": {"district": "$district", "taluka": "$taluka"}}}])],
+        columns=["district", "taluka"])
+    all_talukas = all_talukas[all_talukas["taluka"].notna() & ~all_talukas["taluka"].str.endswith(" Avg", na=False)]
+    links = link_reservoirs_to_talukas(all_talukas)
+    schemes = links["scheme"].to_numpy(dtype=str)
+
+    if state is None:
+        state = ResponseState(schemes, max_lag)
+    else:
+        state.align_to(schemes)
+
+    rain_dates = rain["date"].dropna()
+    reservoir_dates = reservoir["date"].dropna()
+    new_dates = sorted(set(rain_dates) | set(reservoir_dates))
+    if not new_dates:
+        print("[Response] No dates after the cached state")
+        return state.summary(links)
+
+    # Start the day after the cached state so lag windows stay contiguous across runs
+    start = after + timedelta(days=1) if after else new_dates[0]
+    dates, rain_matrix, inflow, filling = build_matrices(links, rain, reservoir, start, new_dates[-1])
+
+    # Rainfall and reservoir data are uploaded separately, so only days both series have
+    # reached are settled, and late rows inside the trailing window can still arrive.
+    # Only days before that window go into the cache; the rest are re-folded every run.
+    settled = min(rain_dates.max(), reservoir_dates.max()) if len(rain_dates) and len(reservoir_dates) else None
+    checkpoint = settled - timedelta(days=refold_days) if settled is not None else None
+    n_settled = sum(1 for day in dates if checkpoint is not None and day <= checkpoint)
+    if n_settled:
+        state.update(dates[:n_settled], rain_matrix[:, :n_settled], inflow[:, :n_settled], filling[:, :n_settled])
+        state.save(cache_path)
+        print(f"[Response] Cached {n_settled} settled days up to {dates[n_settled - 1]:%d.%m.%Y}")
+
+    if n_settled < len(dates):
+        state = copy.deepcopy(state)
+        state.update(dates[n_settled:], rain_matrix[:, n_settled:], inflow[:, n_settled:], filling[:, n_settled:])
+        print(f"[Response] Re-folded {len(dates) - n_settled} recent days up to {dates[-1]:%d.%m.%Y} "
+              f"(not cached)")
+    print(f"[Response] {len(schemes)} reservoirs")
+    return state.summary(links)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rainfall -> reservoir response analysis")
+    parser.add_argument("--max-lag", type=int, default=DEFAULT_MAX_LAG)
+    parser.add_argument("--cache", default=CACHE_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the cache and recompute the season")
+    parser.add_argument("--refold-days", type=int, default=DEFAULT_REFOLD_DAYS,
+                        help="Trailing days kept out of the cache so late uploads are still counted")
+    parser.add_argument("--output", default="reservoir_response.csv")
+    args = parser.parse_args(argv)
+
+    mongo_uri = os.environ.get('MONGODB_URI')
+    if not mongo_uri:
+        raise RuntimeError('Please set the MONGODB_URI environment variable.')
+    from pymongo import MongoClient
+    db = MongoClient(mongo_uri)["rainfall-data"]
+
+    summary = run_analysis(db, args.max_lag, args.cache, args.rebuild, args.refold_days)
+    summary.to_csv(args.output, index=False)
+    print(f"[Response] Wrote {len(summary)} reservoirs to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Run journal for resumable batch ingests.
+
+Each bulletin (keyed by file stem, so `x.pdf` and the `x.csv` parsed from it share an
+entry) records when it was parsed, when its CSV was written and when it was uploaded,
+with the record count. Every mark is its own SQLite transaction, so a run that dies
+mid-backfill leaves an accurate journal and a resumed run skips completed stages and
+retries only what failed or never finished. A changed PDF (size or mtime) resets its entry.
+"""
+import os
+import time
+import sqlite3
+from collections import Counter
+from typing import Dict, List, Optional
+
+JOURNAL_NAME = ".ingest_journal.sqlite3"
+STAGES = ("parsed", "csv", "uploaded")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    fingerprint TEXT,
+    date TEXT,
+    records INTEGER,
+    parsed_at REAL,
+    csv_at REAL,
+    uploaded_at REAL,
+    failed_stage TEXT,
+    error TEXT
+);
+"""
+
+
+def journal_key(fname: str) -> str:
+    return os.path.splitext(os.path.basename(fname))[0]
+
+
+def _fingerprint(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class RunJournal:
+
+    def __init__(self, pdf_dir: str, resume: bool = True):
+        self.path = os.path.join(pdf_dir, JOURNAL_NAME)
+        self._conn = sqlite3.connect(self.path, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+        if not resume:
+            self._conn.execute("DELETE FROM files")
+        self.resumed: Counter = Counter()
+        self.fresh: Counter = Counter()
+        self.failed: Counter = Counter()
+        self.resumed_records = 0
+
+    def _row(self, name: str) -> Optional[sqlite3.Row]:
+        return self._conn.execute("SELECT * FROM files WHERE name = ?", (name,)).fetchone()
+
+    def sync(self, source_path: str):
+        """Starts the entry for a PDF over if the file changed since it was journaled."""
+        name = journal_key(source_path)
+        fingerprint = _fingerprint(source_path)
+        row = self._row(name)
+        if row is not None and row["fingerprint"] not in (None, fingerprint):
+            self._conn.execute("DELETE FROM files WHERE name = ?", (name,))
+        self._conn.execute(
+            "INSERT INTO files (name, fingerprint) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET fingerprint = excluded.fingerprint", (name, fingerprint))
+
+    def is_done(self, fname: str, stage: str) -> bool:
+        """True (and counted as resumed work) if `stage` completed for this file in an earlier run."""
+        row = self._row(journal_key(fname))
+        if row is None or row[f"{stage}_at"] is None:
+            return False
+        self.resumed[stage] += 1
+        if stage == "uploaded":
+            self.resumed_records += row["records"] or 0
+        return True
+
+    def mark(self, fname: str, stage: str, date: Optional[str] = None, records: Optional[int] = None):
+        """Atomically records that `stage` completed for this file."""
+        self._conn.execute(
+            f"INSERT INTO files (name, {stage}_at, date, records) VALUES (?, ?, ?, ?) "
+            f"ON CONFLICT(name) DO UPDATE SET {stage}_at = excluded.{stage}_at, "
+            "date = COALESCE(excluded.date, date), records = COALESCE(excluded.records, records), "
+            "failed_stage = NULL, error = NULL",
+            (journal_key(fname), time.time(), date, records))
+        self.fresh[stage] += 1
+
+    def fail(self, fname: str, stage: str, error: str):
+        self._conn.execute(
+            "INSERT INTO files (name, failed_stage, error) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET failed_stage = excluded.failed_stage, error = excluded.error",
+            (journal_key(fname), stage, error))
+        self.failed[stage] += 1
+
+    def failures(self) -> List[Dict]:
+        return [dict(row) for row in self._conn.execute(
+            "SELECT name, failed_stage, error FROM files WHERE failed_stage IS NOT NULL ORDER BY name")]
+
+    def print_summary(self):
+        for stage in STAGES:
+            if self.resumed[stage] or self.fresh[stage] or self.failed[stage]:
+                line = (f"[Journal] {stage}: {self.resumed[stage]} resumed, "
+                        f"{self.fresh[stage]} fresh, {self.failed[stage]} failed")
+                if stage == "uploaded" and self.resumed[stage]:
+                    line += f" ({self.resumed_records} records already uploaded)"
+                print(line)
+        failures = self.failures()
+        for failure in failures:
+            print(f"[Journal] {failure['name']} failed at {failure['failed_stage']}: {failure['error']}")
+        if failures:
+            print(f"[Journal] Rerun with --resume to retry only these ({self.path})")
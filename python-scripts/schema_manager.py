@@ -0,0 +1,136 @@
+import os
+import sys
+import logging
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import OperationFailure
+
+from reservoir_buckets import BUCKET_COLLECTION, SCHEME_FIELD
+from taluka_reference import DAILY_COLLECTION
+
+MONGO_URI = os.environ.get('MONGODB_URI')
+DB_NAME = "rainfall-data"
+
+# collection -> [(keys, options)]; default index names so Mongoose-declared indexes match
+INDEXES: Dict[str, List[Tuple[list, dict]]] = {
+    "rainfalldatas": [
+        # District/Region Avg rows and same-named talukas in two districts make
+        # (date, taluka) non-unique; (date, district, taluka) is the real key
+        ([("date", ASCENDING), ("district", ASCENDING), ("taluka", ASCENDING)], {"unique": True}),
+        ([("date", ASCENDING), ("taluka", ASCENDING)], {}),
+        ([("taluka_lc", ASCENDING), ("date", ASCENDING)], {}),
+    ],
+    "reservoirdatas": [
+        ([("date", ASCENDING), (SCHEME_FIELD, ASCENDING)], {}),
+        ([(SCHEME_FIELD, ASCENDING), ("date", ASCENDING)], {}),
+    ],
+    BUCKET_COLLECTION: [
+        ([(SCHEME_FIELD, ASCENDING), ("month", ASCENDING)], {"unique": True}),
+    ],
+    DAILY_COLLECTION: [
+        ([("date", ASCENDING), ("taluka_id", ASCENDING)], {"unique": True}),
+        ([("taluka_id", ASCENDING), ("date", ASCENDING)], {}),
+    ],
+}
+
+# (collection, filter, sort) for the reads the site and helpers actually issue
+CANONICAL_QUERIES = [
+    ("rainfalldatas", {"date": "01.07.2025"}, [("taluka", ASCENDING), ("date", ASCENDING)]),
+    ("rainfalldatas", {"taluka_lc": {"$regex": "^ahmedabad"}}, [("taluka", ASCENDING), ("date", ASCENDING)]),
+    ("rainfalldatas", {"date": "01.07.2025", "taluka_lc": "ahmedabad city"}, None),
+    ("reservoirdatas", {"date": "01/07/2025"}, None),
+    ("reservoirdatas", {SCHEME_FIELD: "Thebi"}, None),
+    (BUCKET_COLLECTION, {SCHEME_FIELD: "Thebi"}, [("month", ASCENDING)]),
+    (DAILY_COLLECTION, {"date": "01.07.2025"}, None),
+    (DAILY_COLLECTION, {"taluka_id": "amreli:amreli"}, [("date", ASCENDING)]),
+]
+
+
+def backfill_taluka_lc(db) -> int:
+    """Adds the lowercase lookup field to rainfall documents written before it existed."""
+    result = db["rainfalldatas"].update_many(
+        {"taluka_lc": {"$exists": False}},
+        [{"$set": {"taluka_lc": {"$toLower": "$taluka"}}}],
+    )
+    return result.modified_count
+
+
+def ensure_indexes(db):
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        for keys, options in indexes:
+            name = collection.create_index(keys, **options)
+            print(f"[Schema] {collection_name}: index {name} ready")
+
+
+def _plan_stages(plan) -> List[str]:
+    """Collects every stage name in an explain() plan tree."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+def verify_query_plans(db) -> List[str]:
+    """Explains every canonical query and returns a description of each one that scans a collection."""
+    failures = []
+    for collection_name, query, sort in CANONICAL_QUERIES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = _plan_stages(winning_plan)
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"[Schema] {collection_name} {query} sort={sort}: {' <- '.join(stages)} [{status}]")
+        if status == "COLLSCAN":
+            failures.append(f"{collection_name} {query}")
+    return failures
+
+
+def provision_schema(db) -> bool:
+    """Drops the conflicting legacy index, backfills taluka_lc and creates all indexes."""
+    # Drop the unique (date, taluka) index the Mongoose schema used to declare
+    for info in db["rainfalldatas"].list_indexes():
+        if dict(info["key"]) == {"date": 1, "taluka": 1} and info.get("unique"):
+            db["rainfalldatas"].drop_index(info["name"])
+            print(f"[Schema] rainfalldatas: dropped conflicting unique index {info['name']}")
+    print(f"[Schema] rainfalldatas: backfilled taluka_lc on {backfill_taluka_lc(db)} documents")
+    try:
+        ensure_indexes(db)
+    except OperationFailure as e:
+        # Typically duplicate (date, district, taluka) rows from repeated uploads
+        logging.error(f"Index creation failed: {e}")
+        return False
+    return True
+
+
+def check_schema(db, provision: bool = True) -> int:
+    """Optionally provisions indexes, then fails (returns 1) if any canonical query scans a collection."""
+    if provision and not provision_schema(db):
+        return 1
+    failures = verify_query_plans(db)
+    if failures:
+        logging.error(f"Collection scans in {len(failures)} canonical queries: {failures}")
+        return 1
+    print("[Schema] All canonical queries use an index")
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not MONGO_URI:
+        raise RuntimeError('Please set the MONGODB_URI environment variable.')
+    db = MongoClient(MONGO_URI)[DB_NAME]
+    # --verify-only: check query plans against the indexes already in place
+    return check_schema(db, provision='--verify-only' not in argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import os
+import re
+import gzip
+import json
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List
+
+from taluka_reference import ESTIMATED_FIELD
+
+# Optional encoders: formats whose package is missing are skipped
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Served by Next.js as /snapshots/rainfall/<date>.json etc.
+SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), "..", "public", "snapshots", "rainfall")
+INDEX_FILE = "index.json"
+
+SNAPSHOT_FIELDS = ["region", "district", "sr_no", "taluka", "avg_rain_1995_2024", "rain_till_yesterday",
+                   "rain_last_24hrs", "total_rainfall", "percent_against_avg", "date"]
+
+
+def snapshot_name(date_str: str) -> str:
+    """File stem for a bulletin date: '21.06.2025' stays as is, '/' and spaces become '-'."""
+    return re.sub(r'[^0-9A-Za-z.]+', '-', date_str).strip('-')
+
+
+def _date_sort_key(date_str: str):
+    for fmt in ("%d.%m.%Y", "%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return (0, datetime.strptime(date_str, fmt))
+        except ValueError:
+            continue
+    return (1, date_str)
+
+
+def _write_atomic(path: str, payload: bytes):
+    # Readers never see a half-written file: write alongside, then rename over
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def _write_variants(base_path: str, payload: bytes) -> List[str]:
+    """Writes payload plus its .gz (and .br when brotli is installed) siblings."""
+    written = [base_path]
+    _write_atomic(base_path, payload)
+    _write_atomic(f"{base_path}.gz", gzip.compress(payload, compresslevel=9, mtime=0))
+    written.append(f"{base_path}.gz")
+    if brotli is not None:
+        _write_atomic(f"{base_path}.br", brotli.compress(payload, quality=11))
+        written.append(f"{base_path}.br")
+    return written
+
+
+def _snapshot_row(row: Dict) -> Dict:
+    out = {field: row.get(field) for field in SNAPSHOT_FIELDS}
+    # Interpolated gap-fill rows must not pass for a real bulletin
+    if row.get(ESTIMATED_FIELD):
+        out[ESTIMATED_FIELD] = True
+    return out
+
+
+def write_date_snapshot(date_str: str, rows: List[Dict], out_dir: str = SNAPSHOT_DIR) -> List[str]:
+    """
+    Writes one date's rows, sorted by taluka like the API, as JSON/MessagePack + compressed
+    copies. Estimated (gap-filled) rows keep their `estimated: true` flag.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rows = sorted((_snapshot_row(row) for row in rows), key=lambda r: r["taluka"] or "")
+    stem = os.path.join(out_dir, snapshot_name(date_str))
+
+    payload = json.dumps(rows, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    written = _write_variants(f"{stem}.json", payload)
+    if msgpack is not None:
+        written += _write_variants(f"{stem}.msgpack", msgpack.packb(rows, use_bin_type=True))
+    return written
+
+
+def update_snapshot_index(out_dir: str = SNAPSHOT_DIR) -> Dict:
+    """Rebuilds index.json from the snapshot files present, newest date last."""
+    entries = []
+    for fname in os.listdir(out_dir):
+        if not fname.endswith(".json") or fname == INDEX_FILE:
+            continue
+        path = os.path.join(out_dir, fname)
+        with open(path, "rb") as f:
+            rows = json.loads(f.read())
+        if not rows:
+            continue
+        stem = fname[:-len(".json")]
+        entry = {
+            "date": rows[0]["date"],
+            "file": stem,
+            "records": len(rows),
+            "formats": sorted(
+                ext for ext in ("json", "json.gz", "json.br", "msgpack", "msgpack.gz", "msgpack.br")
+                if os.path.exists(os.path.join(out_dir, f"{stem}.{ext}"))
+            ),
+            "updated": datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds"),
+        }
+        if any(row.get(ESTIMATED_FIELD) for row in rows):
+            entry[ESTIMATED_FIELD] = True
+        entries.append(entry)
+    entries.sort(key=lambda e: _date_sort_key(e["date"]))
+
+    index = {"latest": entries[-1]["date"] if entries else None, "dates": entries}
+    payload = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    _write_variants(os.path.join(out_dir, INDEX_FILE), payload)
+    return index
+
+
+def export_snapshots(fetch_rows: Callable[[str], List[Dict]], dates: Iterable[str],
+                     out_dir: str = SNAPSHOT_DIR) -> int:
+    """
+    Post-ingest step: reads each ingested date back once through `fetch_rows(date)` and
+    refreshes its snapshot files and the index. Returns the number of dates exported.
+    """
+    exported = 0
+    for date_str in sorted(set(dates), key=_date_sort_key):
+        rows = fetch_rows(date_str)
+        if not rows:
+            continue
+        write_date_snapshot(date_str, rows, out_dir)
+        exported += 1
+    if exported:
+        update_snapshot_index(out_dir)
+    missing = [name for name, module in (("msgpack", msgpack), ("brotli", brotli)) if module is None]
+    if missing:
+        logging.info(f"Snapshot formats skipped (install {', '.join(missing)} to enable)")
+    print(f"[Snapshots] Exported {exported} dates to {out_dir}")
+    return exported
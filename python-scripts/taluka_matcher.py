@@ -0,0 +1,157 @@
+import re
+import logging
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+
+def _match_key(name: str) -> str:
+    """Comparison key: lowercase letters only, so spacing/bracket/hyphen noise costs nothing."""
+    return re.sub(r'[^a-z]', '', name.lower())
+
+
+def _edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """
+    Levenshtein distance with a single rolling row. With `limit`, gives up as soon as
+    the distance must exceed it and returns `limit + 1`.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _bigrams(key: str) -> List[str]:
+    padded = f"^{key}$"
+    return [padded[i:i + 2] for i in range(len(padded) - 1)]
+
+
+class TalukaMatcher:
+    """
+    Resolves misspelt taluka names to known ones through a bigram index.
+
+    The index is built once from the known names. A query counts shared bigrams via the
+    inverted lists and only verifies names that pass the q-gram count filter (k edits
+    destroy at most 2k bigrams) and length filter, so it never runs edit distance over
+    every taluka. Results are memoized per raw name and every fuzzy resolution is
+    recorded in `resolutions` for review.
+
+    Fuzzy matches are deliberately conservative (one edit, names of five letters or
+    more, restricted to the caller's candidate set): an unknown name is better left
+    unchanged than silently renamed to a different real taluka.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self._canonical: Dict[str, str] = {}
+        self._index: Dict[str, List[str]] = {}
+        for name in names:
+            key = _match_key(name)
+            if key and key not in self._canonical:
+                self._canonical[key] = name
+                for gram in set(_bigrams(key)):
+                    self._index.setdefault(gram, []).append(key)
+        self._cache: Dict[Tuple[str, Optional[Tuple[str, ...]]], Optional[str]] = {}
+        self.resolutions: List[Tuple[str, str, int]] = []
+
+    def _search(self, key: str, tolerance: int, within: Optional[set] = None) -> List[Tuple[int, str]]:
+        grams = set(_bigrams(key))
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._index.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        min_shared = len(grams) - 2 * tolerance
+        found = []
+        for candidate, count in shared.items():
+            if count < min_shared or abs(len(candidate) - len(key)) > tolerance:
+                continue
+            if within is not None and candidate not in within:
+                continue
+            distance = _edit_distance(key, candidate, tolerance)
+            if distance <= tolerance:
+                found.append((distance, candidate))
+        return sorted(found)
+
+    @staticmethod
+    def _tolerance(key: str) -> int:
+        # Short names like 'Una' or 'Sami' are one typo away from other talukas
+        return 0 if len(key) < 5 else 1
+
+    def match(self, name: str, within: Optional[Collection[str]] = None) -> Optional[str]:
+        """
+        Returns the known taluka `name` most likely refers to, or None if nothing is close.
+        An exact (normalized) match always resolves; a fuzzy one only to a name in `within`
+        when it is given.
+        """
+        cache_key = (name, tuple(within) if within is not None else None)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+
+        key = _match_key(name)
+        resolved = self._canonical.get(key)
+        distance = 0
+        tolerance = self._tolerance(key)
+        if resolved is None and key and tolerance:
+            allowed = {_match_key(n) for n in within} if within is not None else None
+            candidates = self._search(key, tolerance, allowed)
+            # An ambiguous best match is left unresolved rather than guessed
+            if candidates and (len(candidates) == 1 or candidates[0][0] < candidates[1][0]):
+                distance, best = candidates[0]
+                resolved = self._canonical[best]
+
+        if resolved is not None and resolved != name:
+            self.resolutions.append((name, resolved, distance))
+            logging.warning(f"Fuzzy-matched taluka '{name}' -> '{resolved}' (distance {distance})")
+
+        self._cache[cache_key] = resolved
+        return resolved
+
+
+def strip_qualifier(name: str) -> str:
+    """'Mandvi(Kachchh)' / 'Mahuva (Bhavnagar)' -> 'Mandvi' / 'Mahuva', as other sources spell them."""
+    return re.sub(r'\s*\([^()]*\)\s*$', '', str(name)).strip()
+
+
+class DistrictTalukaResolver:
+    """
+    Resolves (district, taluka) pairs from one source onto the known pairs of another.
+
+    The district is matched first and the taluka only among that district's talukas, so
+    same-named talukas in different districts (Mandvi, Mahuva, Kalol) never cross over.
+    A known name is also reachable without its trailing '(District)' qualifier, and a
+    query is tried as given and then without its own qualifier.
+    """
+
+    def __init__(self, known: Iterable[Tuple[str, str]]):
+        known = list(known)
+        # district -> match key of each name/alias -> known taluka; full names win over aliases
+        self._talukas: Dict[str, Dict[str, str]] = {}
+        for strip in (False, True):
+            for district, taluka in known:
+                alias = strip_qualifier(taluka) if strip else taluka
+                self._talukas.setdefault(district, {}).setdefault(_match_key(alias), taluka)
+        self._district_matcher = TalukaMatcher(self._talukas)
+        self._taluka_matcher = TalukaMatcher(key for aliases in self._talukas.values() for key in aliases)
+
+    def resolve(self, district: str, taluka: str) -> Optional[Tuple[str, str]]:
+        """Returns the known (district, taluka) this pair refers to, or None."""
+        district = self._district_matcher.match(str(district).strip())
+        aliases = self._talukas.get(district)
+        if not aliases:
+            return None
+        for name in dict.fromkeys((str(taluka).strip(), strip_qualifier(taluka))):
+            resolved = self._taluka_matcher.match(name, within=aliases)
+            if resolved is not None and _match_key(resolved) in aliases:
+                return district, aliases[_match_key(resolved)]
+        return None
@@ -0,0 +1,162 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from pymongo import UpdateOne
+
+from change_detection import add_content_hashes, sync_date_documents
+from taluka_matcher import DistrictTalukaResolver
+
+METADATA_CSV = os.path.join(os.path.dirname(__file__), "..", "public", "Metadata.csv")
+TALUKAS_COLLECTION = "talukas"
+DAILY_COLLECTION = "rainfalldaily"
+
+# Attributes that never change day to day and live on the taluka reference document
+STATIC_FIELDS = ["region", "district", "sr_no", "taluka", "avg_rain_1995_2024"]
+# Attributes carried by every daily fact document
+METRIC_FIELDS = ["rain_till_yesterday", "rain_last_24hrs", "total_rainfall", "percent_against_avg"]
+# Set on interpolated rows for days with no bulletin (cross-day gap filling)
+ESTIMATED_FIELD = "estimated"
+# Identifies a daily fact within its date for diff-mode writes
+FACT_KEY_FIELDS = ("taluka_id",)
+
+
+def _name_key(name: str) -> str:
+    """Lowercase alphanumeric key so 'Kunkavav Vadia' and 'Kunkavav vadia' compare equal."""
+    return re.sub(r'[^a-z0-9]+', '', str(name).lower())
+
+
+def make_taluka_id(district: str, taluka: str) -> str:
+    """Stable id for a taluka (or district/region average row), e.g. 'gandhinagar:kalol-gandhinagar'."""
+    def slug(value):
+        return re.sub(r'[^a-z0-9]+', '-', str(value).lower()).strip('-')
+    return f"{slug(district)}:{slug(taluka)}"
+
+
+ReservoirLinks = Dict[Tuple[str, str], List[Dict]]
+
+
+def load_reservoir_links(metadata_path: str = METADATA_CSV) -> ReservoirLinks:
+    """Groups reservoir schemes in Metadata.csv by the (district, taluka) they sit in."""
+    if not os.path.exists(metadata_path):
+        return {}
+    meta = pd.read_csv(metadata_path)
+    links: ReservoirLinks = {}
+    for _, row in meta.iterrows():
+        if pd.isna(row.get("Taluka")) or pd.isna(row.get("Name of Schemes")):
+            continue
+        key = (str(row["District"]).strip(), str(row["Taluka"]).strip())
+        links.setdefault(key, []).append({
+            "scheme_id": int(row["SchemeId"]),
+            "name": str(row["Name of Schemes"]).strip(),
+            "district": str(row["District"]).strip(),
+        })
+    return links
+
+
+def split_records(records: List[Dict], reservoir_links: Optional[ReservoirLinks] = None
+                  ) -> Tuple[Dict[str, Dict], List[Dict]]:
+    """
+    Splits full daily rows into taluka reference documents (keyed by id) and
+    compact daily fact documents that only hold the id, date and metrics.
+    Reservoirs are attached by resolving each row's taluka within its own district.
+    """
+    reservoir_links = reservoir_links or {}
+    resolver = DistrictTalukaResolver(reservoir_links) if reservoir_links else None
+    references: Dict[str, Dict] = {}
+    facts: List[Dict] = []
+
+    for record in records:
+        taluka_id = make_taluka_id(record.get("district", ""), record["taluka"])
+        if taluka_id not in references:
+            reference = {field: record.get(field) for field in STATIC_FIELDS}
+            reference["_id"] = taluka_id
+            reference["is_aggregate"] = record["taluka"].endswith(" Avg")
+            linked = None
+            if resolver is not None and not reference["is_aggregate"]:
+                linked = resolver.resolve(record.get("district", ""), record["taluka"])
+            reservoirs = reservoir_links.get(linked, []) if linked else []
+            reference["reservoirs"] = [
+                {"scheme_id": r["scheme_id"], "name": r["name"]} for r in reservoirs
+            ]
+            references[taluka_id] = reference
+
+        fact = {"taluka_id": taluka_id, "date": record["date"]}
+        for field in METRIC_FIELDS:
+            fact[field] = record.get(field, 0.0)
+        if record.get(ESTIMATED_FIELD):
+            fact[ESTIMATED_FIELD] = True
+        facts.append(fact)
+
+    return references, add_content_hashes(facts)
+
+
+def upsert_taluka_references(collection, references: Dict[str, Dict]) -> int:
+    """Creates or refreshes taluka reference documents; returns the number of upserts."""
+    if not references:
+        return 0
+    operations = [
+        UpdateOne({"_id": taluka_id}, {"$set": {k: v for k, v in ref.items() if k != "_id"}}, upsert=True)
+        for taluka_id, ref in references.items()
+    ]
+    result = collection.bulk_write(operations, ordered=False)
+    return result.upserted_count
+
+
+def write_compact_date_records(db, date_str: str, records: List[Dict],
+                               reservoir_links: Optional[ReservoirLinks] = None,
+                               batch_size: int = 500, replace: bool = True,
+                               diff: bool = False, dry_run: bool = False, sync=None) -> int:
+    """
+    Normalized counterpart of `write_date_records`: refresh references, then write the date's facts.
+    Diff-mode chunks of a streamed file go through `sync` (a ChunkedDateSync on the daily collection).
+    """
+    if reservoir_links is None:
+        reservoir_links = load_reservoir_links()
+    references, facts = split_records(records, reservoir_links)
+    daily = db[DAILY_COLLECTION]
+    if diff:
+        if not dry_run:
+            upsert_taluka_references(db[TALUKAS_COLLECTION], references)
+        if sync is not None:
+            sync.write(date_str, facts)
+        else:
+            sync_date_documents(daily, date_str, facts, FACT_KEY_FIELDS, dry_run=dry_run, replace=replace)
+        return len(facts)
+
+    upsert_taluka_references(db[TALUKAS_COLLECTION], references)
+    if replace:
+        daily.delete_many({"date": date_str})
+    for i in range(0, len(facts), batch_size):
+        daily.insert_many(facts[i:i + batch_size])
+    return len(facts)
+
+
+def find_rainfall(db, date: Optional[str] = None, taluka: Optional[str] = None) -> List[Dict]:
+    """
+    Compatibility read path: returns documents shaped like the legacy `rainfalldatas`
+    rows by joining compact daily facts with their taluka references.
+    """
+    references = {ref["_id"]: ref for ref in db[TALUKAS_COLLECTION].find({})}
+
+    query: Dict = {}
+    if date:
+        query["date"] = date
+    if taluka:
+        wanted = _name_key(taluka)
+        query["taluka_id"] = {"$in": [
+            taluka_id for taluka_id, ref in references.items() if wanted in _name_key(ref["taluka"])
+        ]}
+
+    rows = []
+    for fact in db[DAILY_COLLECTION].find(query, {"_id": 0}):
+        reference = references.get(fact["taluka_id"], {})
+        row = {field: reference.get(field) for field in STATIC_FIELDS}
+        row.update({field: fact.get(field) for field in METRIC_FIELDS})
+        row["date"] = fact["date"]
+        if fact.get(ESTIMATED_FIELD):
+            row[ESTIMATED_FIELD] = True
+        rows.append(row)
+    rows.sort(key=lambda r: (r["taluka"] or "", r["date"]))
+    return rows
@@ -1,99 +1,119 @@
 import os
-import pandas as pd
+import sys
 from pymongo import MongoClient
 import re
+from batch_pdf_to_mongo import DIFF_KEY_FIELDS, stream_csv_records, write_date_records_diff
+from change_detection import ChunkedDateSync
 
 MONGO_URI = os.environ.get('MONGODB_URI')
-if not MONGO_URI:
-    raise RuntimeError('Please set the MONGODB_URI environment variable.')
 DB_NAME = "rainfall-data"
 COLLECTION_NAME = "rainfalldatas"
 
 # Directory containing your PDF/CSV files
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "public", "Rainfall")
 
-def clean_numeric_value(value):
-    """Clean and convert numeric values, handling NaN and empty strings"""
-    if pd.isna(value) or value == '' or value == 'nan':
-        return 0.0
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return 0.0
-
-def clean_string_value(value):
-    """Clean string values, handling NaN and empty strings"""
-    if pd.isna(value) or value == '' or str(value).lower() == 'nan':
-        return ''
-    return str(value).strip()
-
 def extract_date_from_filename(filename):
-    # Assumes date is the last part before .pdf, e.g. ...21.06.2025.pdf
-    match = re.search(r'(\d{2}\.\d{2}\.\d{4})\.pdf$', filename)
+    # Assumes date is the last part before the extension, e.g. ...21.06.2025.pdf / .csv
+    match = re.search(r'(\d{2}\.\d{2}\.\d{4})\.(?:pdf|csv)$', filename, re.IGNORECASE)
     if match:
         return match.group(1)
     return None
 
-def main():
-    client = MongoClient(MONGO_URI)
-    db = client[DB_NAME]
-    collection = db[COLLECTION_NAME]
+def upload_rainfall_csvs(db, data_dir=DATA_DIR, compact=False, diff=False, dry_run=False):
+    """
+    Replace the rainfall collection with every dated CSV in `data_dir`.
+
+    With `diff`, each date is synced instead of the collection being wiped: only
+    documents whose content hash changed are written, and dates with no CSV left are
+    deleted. `dry_run` reports that diff without writing anything.
+    """
+    diff = diff or dry_run
+    if compact:
+        from taluka_reference import DAILY_COLLECTION, FACT_KEY_FIELDS, load_reservoir_links, write_compact_date_records
+        collection = db[DAILY_COLLECTION]
+        reservoir_links = load_reservoir_links()
+        key_fields = FACT_KEY_FIELDS
+    else:
+        collection = db[COLLECTION_NAME]
+        key_fields = DIFF_KEY_FIELDS
+    # Diff writes of a file's chunks share one stored-hash map; deletes wait for its last chunk
+    sync = ChunkedDateSync(collection, key_fields, dry_run=dry_run) if diff else None
 
-    # Clear existing data
-    print("Clearing existing data from database...")
-    result = collection.delete_many({})
-    print(f"Deleted {result.deleted_count} existing records")
+    if not diff:
+        # Clear existing data
+        print("Clearing existing data from database...")
+        result = collection.delete_many({})
+        print(f"Deleted {result.deleted_count} existing records")
 
     total_records = 0
+    seen_dates = set()
 
-    for filename in os.listdir(DATA_DIR):
+    for filename in os.listdir(data_dir):
         if not filename.lower().endswith('.csv'):
             continue
-        path = os.path.join(DATA_DIR, filename)
+        path = os.path.join(data_dir, filename)
         date_str = extract_date_from_filename(filename)
         if not date_str:
             print(f"Could not extract date from filename: {filename}")
             continue
         print(f"Processing {filename} (date: {date_str}) ...")
+        seen_dates.add(date_str)
         try:
-            df = pd.read_csv(path)
-            df["date"] = date_str
-            records = []
-            for _, row in df.iterrows():
-                if pd.isna(row.get('taluka')) or str(row.get('taluka')).strip() == '':
-                    continue
-                record = {
-                    'region': clean_string_value(row.get('region', '')),
-                    'district': clean_string_value(row.get('district', '')),
-                    'sr_no': clean_numeric_value(row.get('sr_no', 0)),
-                    'taluka': clean_string_value(row.get('taluka', '')),
-                    'avg_rain_1995_2024': clean_numeric_value(row.get('avg_rain_1995_2024', 0)),
-                    'rain_till_yesterday': clean_numeric_value(row.get('rain_till_yesterday', 0)),
-                    'rain_last_24hrs': clean_numeric_value(row.get('rain_last_24hrs', 0)),
-                    'total_rainfall': clean_numeric_value(row.get('total_rainfall', 0)),
-                    'percent_against_avg': clean_numeric_value(row.get('percent_against_avg', 0)),
-                    'date': date_str
-                }
-                if record['taluka'] and record['taluka'] != '':
-                    records.append(record)
-            if records:
-                batch_size = 100
-                for i in range(0, len(records), batch_size):
-                    batch = records[i:i + batch_size]
-                    collection.insert_many(batch)
-                total_records += len(records)
-                print(f"Uploaded {len(records)} records from {filename}")
+            # Stream the file in chunks so memory stays flat for large merged exports
+            file_records = 0
+            for _, records in stream_csv_records(path, override_date=date_str):
+                if compact:
+                    file_records += write_compact_date_records(db, date_str, records, reservoir_links,
+                                                               replace=False, diff=diff,
+                                                               dry_run=dry_run, sync=sync)
+                elif diff:
+                    file_records += write_date_records_diff(collection, date_str, records,
+                                                            dry_run=dry_run, sync=sync)
+                else:
+                    batch_size = 100
+                    for i in range(0, len(records), batch_size):
+                        batch = records[i:i + batch_size]
+                        collection.insert_many(batch)
+                    file_records += len(records)
+            if sync is not None:
+                sync.finish()
+            if file_records:
+                total_records += file_records
+                print(f"Uploaded {file_records} records from {filename}")
             else:
                 print(f"No valid records found in {filename}")
         except Exception as e:
+            if sync is not None:
+                # A partly read file must not delete the rows its unread chunks hold
+                sync.discard()
             print(f"Error processing {filename}: {str(e)}")
             continue
 
+    # Without any dated CSV every stored date would look stale; never wipe on that basis
+    if diff and seen_dates:
+        stale_dates = sorted(set(collection.distinct('date')) - seen_dates)
+        if stale_dates:
+            prefix = "[Diff dry-run]" if dry_run else "[Diff]"
+            print(f"{prefix} Removing {len(stale_dates)} dates with no CSV: {stale_dates}")
+            if not dry_run:
+                collection.delete_many({'date': {'$in': stale_dates}})
+
     print(f"All files uploaded successfully! Total records: {total_records}")
     final_count = collection.count_documents({})
     print(f"Total records in database: {final_count}")
     dates = collection.distinct('date')
     print(f"Available dates: {sorted(dates)}")
+    return total_records
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not MONGO_URI:
+        raise RuntimeError('Please set the MONGODB_URI environment variable.')
+    client = MongoClient(MONGO_URI)
+    # --compact: write taluka reference docs + compact daily facts instead of full rows
+    # --diff: sync each date, writing only changed documents; --dry-run: report the diff only
+    upload_rainfall_csvs(client[DB_NAME], DATA_DIR, compact='--compact' in argv,
+                         diff='--diff' in argv, dry_run='--dry-run' in argv)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,12 +1,12 @@
 import os
+import sys
 import pandas as pd
 from pymongo import MongoClient
 from datetime import datetime
+from reservoir_buckets import BUCKET_COLLECTION, ensure_bucket_index, upsert_bucketed_records
 
 # Configuration
 MONGO_URI = os.environ.get('MONGODB_URI')
-if not MONGO_URI:
-    raise RuntimeError('Please set the MONGODB_URI environment variable.')
 DB_NAME = "rainfall-data"
 COLLECTION_NAME = "reservoirdatas"
 CSV_DIR = os.path.join(os.path.dirname(__file__), "..", "public", "extracted_data")
@@ -34,17 +34,8 @@ def clean_percentage(value):
     except:
         return 0
 
-# Connect to MongoDB
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-collection = db[COLLECTION_NAME]
-
-# Process all CSVs in the directory
-for fname in os.listdir(CSV_DIR):
-    if not fname.lower().endswith(".csv"):
-        continue
-    fpath = os.path.join(CSV_DIR, fname)
-    print(f"Processing {fname} ...")
+def load_reservoir_csv(fpath, fname):
+    """Read one reservoir CSV and return its relevant columns with a standardized date."""
     df = pd.read_csv(fpath)
 
     # Try to find a date column or infer date from filename
@@ -83,15 +74,47 @@ for fname in os.listdir(CSV_DIR):
     df = df[available_cols]
     
     # Filter out rows with NaN Name of Schemes
-    df = df.dropna(subset=['Name of Schemes'])
+    return df.dropna(subset=['Name of Schemes'])
 
-    # Convert to dicts and upload
-    records = df.to_dict("records")
-    if records:
-        result = collection.insert_many(records)
-        print(f"Uploaded {len(result.inserted_ids)} records from {fname}")
+def upload_reservoir_csvs(db, csv_dir=CSV_DIR, bucketed=False):
+    """Upload every reservoir CSV in `csv_dir`; `bucketed` folds days into monthly documents."""
+    if bucketed:
+        collection = db[BUCKET_COLLECTION]
+        ensure_bucket_index(collection)
     else:
-        print(f"No records found in {fname}")
+        collection = db[COLLECTION_NAME]
+
+    # Process all CSVs in the directory
+    for fname in os.listdir(csv_dir):
+        if not fname.lower().endswith(".csv"):
+            continue
+        fpath = os.path.join(csv_dir, fname)
+        print(f"Processing {fname} ...")
+        df = load_reservoir_csv(fpath, fname)
+
+        # Convert to dicts and upload
+        records = df.to_dict("records")
+        if records and bucketed:
+            written = upsert_bucketed_records(collection, records)
+            print(f"Bucketed {written} records from {fname}")
+        elif records:
+            result = collection.insert_many(records)
+            print(f"Uploaded {len(result.inserted_ids)} records from {fname}")
+        else:
+            print(f"No records found in {fname}")
+
+    print("Done.")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not MONGO_URI:
+        raise RuntimeError('Please set the MONGODB_URI environment variable.')
+
+    # Connect to MongoDB
+    client = MongoClient(MONGO_URI)
+    # --bucketed: one document per reservoir per month instead of one per day
+    upload_reservoir_csvs(client[DB_NAME], CSV_DIR, bucketed='--bucketed' in argv)
+    client.close()
 
-print("Done.")
-client.close() 
\ No newline at end of file
+if __name__ == "__main__":
+    main()
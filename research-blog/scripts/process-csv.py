@@ -1,11 +1,20 @@
 import pandas as pd
 import numpy as np
+import matplotlib
+# Non-interactive backend: no display needed and safe inside worker processes
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import sys
 import os
+import re
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-def process_csv_data(csv_path, date_str):
+OUTPUT_FILES = ("analysis_plot.png", "summary.txt")
+
+def process_csv_data(csv_path, date_str, dpi=300):
     """
     Placeholder function for CSV data processing.
     This will be customized based on your specific research needs.
@@ -52,7 +61,7 @@ def process_csv_data(csv_path, date_str):
                 plt.xticks(rotation=45)
             
             plt.tight_layout()
-            plt.savefig(f"{output_dir}/analysis_plot.png", dpi=300, bbox_inches='tight')
+            plt.savefig(f"{output_dir}/analysis_plot.png", dpi=dpi, bbox_inches='tight')
             plt.close()
             
             print(f"Analysis plot saved to: {output_dir}/analysis_plot.png")
@@ -76,9 +85,72 @@ def process_csv_data(csv_path, date_str):
         print(f"Error processing CSV: {str(e)}")
         return False
 
+def date_from_filename(csv_path):
+    """Uses the DD.MM.YYYY part of the filename as the output date, else the file stem."""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    match = re.search(r'(\d{2}\.\d{2}\.\d{4})', stem)
+    return match.group(1) if match else stem
+
+def outputs_up_to_date(csv_path, date_str):
+    """True when every output for this date exists and is newer than the input CSV."""
+    csv_mtime = os.path.getmtime(csv_path)
+    for name in OUTPUT_FILES:
+        output_path = os.path.join("outputs", date_str, name)
+        if not os.path.exists(output_path) or os.path.getmtime(output_path) < csv_mtime:
+            return False
+    return True
+
+def _process_job(job):
+    csv_path, date_str, dpi = job
+    return csv_path, process_csv_data(csv_path, date_str, dpi=dpi)
+
+def process_batch(source, workers=None, dpi=300, force=False):
+    """
+    Processes every CSV in a directory (or matching a glob) across a process pool,
+    skipping dates whose outputs are newer than their input unless `force` is set.
+    """
+    if os.path.isdir(source):
+        csv_paths = sorted(glob.glob(os.path.join(source, "*.csv")))
+    else:
+        csv_paths = sorted(glob.glob(source))
+
+    jobs = []
+    skipped = 0
+    for csv_path in csv_paths:
+        date_str = date_from_filename(csv_path)
+        if not force and outputs_up_to_date(csv_path, date_str):
+            skipped += 1
+            continue
+        jobs.append((csv_path, date_str, dpi))
+
+    print(f"Batch: {len(csv_paths)} files found, {skipped} up to date, {len(jobs)} to process")
+    start = time.perf_counter()
+    failed = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for csv_path, success in pool.map(_process_job, jobs):
+                if not success:
+                    failed.append(csv_path)
+    elapsed = time.perf_counter() - start
+
+    rate = len(jobs) / elapsed if elapsed > 0 else 0.0
+    print(f"Batch completed: {len(jobs) - len(failed)} processed, {len(failed)} failed "
+          f"in {elapsed:.1f}s ({rate:.2f} files/second)")
+    for csv_path in failed:
+        print(f"  Failed: {csv_path}")
+    return not failed
+
 if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "--batch":
+        args = sys.argv[3:]
+        workers = int(args[args.index("--workers") + 1]) if "--workers" in args else None
+        dpi = int(args[args.index("--dpi") + 1]) if "--dpi" in args else 300
+        success = process_batch(sys.argv[2], workers=workers, dpi=dpi, force="--force" in args)
+        sys.exit(0 if success else 1)
+
     if len(sys.argv) != 3:
         print("Usage: python process-csv.py <csv_path> <date>")
+        print("       python process-csv.py --batch <dir_or_glob> [--workers N] [--dpi N] [--force]")
         sys.exit(1)
     
     csv_path = sys.argv[1]
@@ -86,3 +158,4 @@ if __name__ == "__main__":
     
     success = process_csv_data(csv_path, date_str)
     sys.exit(0 if success else 1)
+
@@ -0,0 +1,190 @@
+import os
+import re
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROLLING_WINDOWS = (3, 7, 30)
+
+# IMD daily categories (mm): heavy, very heavy, extremely heavy -> flags 1, 2, 3
+EXTREME_THRESHOLDS = np.array([64.5, 115.6, 204.5])
+
+# Bump when cached columns are computed differently so stale caches are rebuilt
+CACHE_VERSION = 3
+
+DATE_PATTERN = re.compile(r'(\d{2})[./-](\d{2})[./-](\d{4})')
+
+
+def parse_bulletin_date(text):
+    """Finds a DD.MM.YYYY (or / -) date in a filename or 'date' value."""
+    match = DATE_PATTERN.search(str(text))
+    if not match:
+        return None
+    day, month, year = match.groups()
+    return datetime(int(year), int(month), int(day))
+
+
+def load_season_grid(csv_dir):
+    """
+    Loads every daily bulletin CSV in `csv_dir` onto a taluka x date grid.
+
+    Returns (talukas, dates, grids, avg) where `talukas` is an (n, 2) array of
+    (district, taluka) rows, so same-named talukas in different districts (the two
+    Kalols) stay separate; `grids` maps rain_last_24hrs and total_rainfall to 2-D arrays
+    (NaN where a taluka is missing on a day) and `avg` is the per-taluka
+    avg_rain_1995_2024 vector. District/region average rows are skipped.
+    The date axis has one column per calendar day from the first to the last bulletin,
+    so days without a bulletin are all-NaN columns and rolling windows span real days.
+    """
+    frames = []
+    for fname in sorted(os.listdir(csv_dir)):
+        if not fname.lower().endswith('.csv'):
+            continue
+        df = pd.read_csv(os.path.join(csv_dir, fname))
+        if 'taluka' not in df.columns:
+            continue
+        date = None
+        if 'date' in df.columns and df['date'].notna().any():
+            date = parse_bulletin_date(df['date'].dropna().iloc[0])
+        date = date or parse_bulletin_date(fname)
+        if date is None:
+            print(f"Skipping {fname}: no date found")
+            continue
+        df = df[df['taluka'].notna() & ~df['taluka'].astype(str).str.endswith(' Avg')]
+        if 'district' not in df.columns:
+            df = df.assign(district='')
+        df = df.assign(date=date, district=df['district'].fillna('').astype(str))
+        frames.append(df[['district', 'taluka', 'date', 'avg_rain_1995_2024', 'rain_last_24hrs', 'total_rainfall']])
+
+    if not frames:
+        raise ValueError(f"No bulletin CSVs with dates found in {csv_dir}")
+
+    keys = ['district', 'taluka']
+    season = pd.concat(frames, ignore_index=True).drop_duplicates(subset=keys + ['date'], keep='last')
+    index = pd.MultiIndex.from_frame(season[keys].drop_duplicates()).sort_values()
+    dates = pd.date_range(season['date'].min(), season['date'].max(), freq='D')
+
+    grids = {
+        column: season.pivot(index=keys, columns='date', values=column)
+                      .reindex(index=index, columns=dates).to_numpy(dtype=float)
+        for column in ('rain_last_24hrs', 'total_rainfall')
+    }
+    avg = season.groupby(keys)['avg_rain_1995_2024'].last().reindex(index).to_numpy(dtype=float)
+    talukas = np.array(index.to_list(), dtype=str).reshape(-1, 2)
+    return talukas, list(dates.to_pydatetime()), grids, avg
+
+
+def _cache_path(cache_dir, date):
+    return os.path.join(cache_dir, f"{date:%Y-%m-%d}.npz")
+
+
+def _load_cached_column(cache_dir, date, talukas, inputs):
+    """Returns the cached per-date results if they were built from identical inputs."""
+    path = _cache_path(cache_dir, date)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as cached:
+        if 'version' not in cached.files or int(cached['version']) != CACHE_VERSION:
+            return None
+        if not np.array_equal(cached['talukas'], talukas.astype(str)):
+            return None
+        for name, column in inputs.items():
+            if name not in cached.files or not np.array_equal(cached[name], column, equal_nan=True):
+                return None
+        return {key: cached[key] for key in cached.files}
+
+
+def compute_season_metrics(talukas, dates, grids, avg, cache_dir=None):
+    """
+    Computes rolling totals, season cumulative rain, departure from the 1995-2024
+    average and extreme-day flags for the whole grid.
+
+    Rolling sums are differences of one cumulative sum along the date axis, so every
+    window costs a single subtraction. With `cache_dir`, each date's column is stored;
+    dates whose inputs are unchanged are loaded back and every metric is computed only
+    for columns from the first new or changed date onwards.
+    """
+    daily = grids['rain_last_24hrs']
+    total = grids['total_rainfall']
+    n_talukas, n_dates = daily.shape
+
+    names = ['cumulative'] + [f'rolling_{w}d' for w in ROLLING_WINDOWS] + ['departure_pct']
+    metrics = {name: np.empty((n_talukas, n_dates)) for name in names}
+    metrics['extreme_flag'] = np.empty((n_talukas, n_dates), dtype=np.int8)
+    # Every input a cached column was derived from; a change in any of them invalidates it
+    def inputs(j):
+        return {'daily': daily[:, j], 'total': total[:, j], 'avg': avg}
+
+    start = 0
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        while start < n_dates:
+            cached = _load_cached_column(cache_dir, dates[start], talukas, inputs(start))
+            if cached is None:
+                break
+            for name, values in metrics.items():
+                values[:, start] = cached[name]
+            start += 1
+
+    # Running sum of observed daily rain; missing days contribute nothing
+    cumulative = metrics['cumulative']
+    previous = cumulative[:, start - 1] if start > 0 else np.zeros(n_talukas)
+    cumulative[:, start:] = previous[:, None] + np.nancumsum(daily[:, start:], axis=1)
+
+    # Pad with a zero column so window k at column j is cumsum[j] - cumsum[j - k];
+    # earlier (cached) cumulative columns supply the lagged values for new columns
+    padded = np.concatenate([np.zeros((n_talukas, 1)), cumulative], axis=1)
+    columns = np.arange(start + 1, n_dates + 1)
+    for window in ROLLING_WINDOWS:
+        lagged = padded[:, np.maximum(columns - window, 0)]
+        metrics[f'rolling_{window}d'][:, start:] = padded[:, columns] - lagged
+
+    new_total = total[:, start:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics['departure_pct'][:, start:] = np.where(
+            avg[:, None] > 0, (new_total - avg[:, None]) / avg[:, None] * 100.0, np.nan)
+    metrics['extreme_flag'][:, start:] = np.digitize(np.nan_to_num(daily[:, start:]), EXTREME_THRESHOLDS)
+
+    if cache_dir:
+        for j in range(start, n_dates):
+            np.savez(_cache_path(cache_dir, dates[j]),
+                     version=CACHE_VERSION, talukas=talukas.astype(str), **inputs(j),
+                     **{name: values[:, j] for name, values in metrics.items()})
+        print(f"Computed {n_dates - start} new date column(s), {start} loaded from cache")
+
+    return metrics
+
+
+def metrics_to_frame(talukas, dates, grids, metrics):
+    """Flattens the grids into one long district/taluka/date table."""
+    n_talukas, n_dates = grids['rain_last_24hrs'].shape
+    frame = pd.DataFrame({
+        'district': np.repeat(talukas[:, 0], n_dates),
+        'taluka': np.repeat(talukas[:, 1], n_dates),
+        'date': np.tile(np.array(dates, dtype='datetime64[ns]'), n_talukas),
+        'rain_last_24hrs': grids['rain_last_24hrs'].ravel(),
+        'total_rainfall': grids['total_rainfall'].ravel(),
+    })
+    for name, values in metrics.items():
+        frame[name] = values.ravel()
+    return frame
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python rainfall_engine.py <csv_dir> [cache_dir]")
+        sys.exit(1)
+
+    csv_dir = sys.argv[1]
+    cache_dir = sys.argv[2] if len(sys.argv) == 3 else os.path.join("outputs", "season_cache")
+
+    talukas, dates, grids, avg = load_season_grid(csv_dir)
+    metrics = compute_season_metrics(talukas, dates, grids, avg, cache_dir=cache_dir)
+    frame = metrics_to_frame(talukas, dates, grids, metrics)
+
+    os.makedirs("outputs", exist_ok=True)
+    output_path = os.path.join("outputs", "season_metrics.csv")
+    frame.to_csv(output_path, index=False)
+    print(f"{len(talukas)} talukas x {len(dates)} dates -> {output_path}")